@@ -22,7 +22,7 @@ import {
   detectMode,
   type ErrorReport,
 } from "../../shared/errors/index"
-import { VERSION } from "../../tui/src/utils"
+import { VERSION, DEFAULT_MAX_WORKERS, createLimiter } from "../../tui/src/utils"
 import {
   getVideoInfo,
   downloadVideo,
@@ -59,9 +59,13 @@ const API_KEY = process.env.TAPIR_API_KEY || ""
 const CORS_ORIGIN = process.env.TAPIR_CORS_ORIGIN || "*"
 const RATE_LIMIT = parseInt(process.env.TAPIR_RATE_LIMIT || "60")
 const RATE_WINDOW_MS = 60_000
+const MAX_CONCURRENT_DOWNLOADS = parseInt(process.env.TAPIR_MAX_CONCURRENT_DOWNLOADS || String(DEFAULT_MAX_WORKERS))
 const DISABLE_RATE_LIMIT = process.env.TAPIR_DISABLE_RATE_LIMIT === "true"
 let shuttingDown = false
 
+// Bounds concurrent yt-dlp processes across all queued download jobs
+const runDownload = createLimiter(MAX_CONCURRENT_DOWNLOADS)
+
 // ============================================================================
 // Rate Limiting (per-IP sliding window)
 // ============================================================================
@@ -553,8 +557,12 @@ async function handleRequest(req: Request, server: any): Promise<Response> {
     jobs.set(job.id, job)
     invalidateJobsCache()
 
-    // Start processing in background
-    processDownloadJob(job).catch(() => {
+    // Start processing in background; the job stays "queued" until a download
+    // slot frees, and is skipped if it was deleted while waiting
+    runDownload(async () => {
+      if (!jobs.has(job.id) || job.status !== "queued") return
+      await processDownloadJob(job)
+    }).catch(() => {
       job.status = "failed"
       job.completedAt = Date.now()
       invalidateJobsCache()
@@ -14,6 +14,20 @@ import {
   getFileInfo,
   convertAudioFile,
 } from "../services/converter"
+import { mockSpawn } from "./helpers/spawn"
+
+// Canned ffprobe reply, serialized once and handed to every stubbed spawn
+const PROBE_OUTPUT = JSON.stringify({ format: { duration: "1.0" } })
+
+let originalSpawn: typeof Bun.spawn
+
+beforeEach(() => {
+  originalSpawn = Bun.spawn
+})
+
+afterEach(() => {
+  Bun.spawn = originalSpawn
+})
 
 // ============================================================================
 // isSupportedAudioFile
@@ -24,52 +38,18 @@ describe("isSupportedAudioFile", () => {
     expect(isSupportedAudioFile("/nonexistent/file.mp3")).toBe(false)
   })
 
-  test("returns true for supported audio extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.mp3`)
+  test.each([
+    [".mp3", true],
+    [".wav", true],
+    [".flac", true],
+    [".ogg", true],
+    [".m4a", true],
+    [".txt", false],
+    [".mp4", false],
+  ])("existing %s file -> %s", (ext, expected) => {
+    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}${ext}`)
     writeFileSync(tmpFile, "fake audio")
-    expect(isSupportedAudioFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .wav extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.wav`)
-    writeFileSync(tmpFile, "fake wav")
-    expect(isSupportedAudioFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .flac extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.flac`)
-    writeFileSync(tmpFile, "fake flac")
-    expect(isSupportedAudioFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .ogg extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.ogg`)
-    writeFileSync(tmpFile, "fake ogg")
-    expect(isSupportedAudioFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .m4a extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.m4a`)
-    writeFileSync(tmpFile, "fake m4a")
-    expect(isSupportedAudioFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns false for unsupported extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.txt`)
-    writeFileSync(tmpFile, "text")
-    expect(isSupportedAudioFile(tmpFile)).toBe(false)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns false for video extension", () => {
-    const tmpFile = join(tmpdir(), `tapir_audio_${Date.now()}.mp4`)
-    writeFileSync(tmpFile, "video")
-    expect(isSupportedAudioFile(tmpFile)).toBe(false)
+    expect(isSupportedAudioFile(tmpFile)).toBe(expected)
     rmSync(tmpFile, { force: true })
   })
 })
@@ -125,6 +105,11 @@ describe("getQualityDescription", () => {
     expect(getQualityDescription("opus", 128)).toBe("Standard (128kbps)")
   })
 
+  test("uses the highest tier the bitrate reaches", () => {
+    expect(getQualityDescription("mp3", 319)).toBe("High (256kbps)")
+    expect(getQualityDescription("libmp3lame", 500)).toBe("Very High (320kbps)")
+  })
+
   test("returns Low for <128kbps lossy", () => {
     expect(getQualityDescription("mp3", 64)).toBe("Low (64kbps)")
   })
@@ -170,6 +155,45 @@ describe("getAudioMetadata", () => {
     expect(result === null || typeof result === "object").toBe(true)
     rmSync(tmpFile, { force: true })
   })
+
+  test("reuses probe results until the file changes", async () => {
+    const tmpFile = join(tmpdir(), `tapir_meta_cache_${Date.now()}.mp3`)
+    writeFileSync(tmpFile, "audio")
+
+    const calls = mockSpawn({ stdout: PROBE_OUTPUT })
+
+    try {
+      const first = await getAudioMetadata(tmpFile)
+      const second = await getAudioMetadata(tmpFile)
+      expect(first?.format?.duration).toBe("1.0")
+      expect(second).toEqual(first)
+      expect(calls.length).toBe(1)
+
+      writeFileSync(tmpFile, "longer audio")
+      await getAudioMetadata(tmpFile)
+      expect(calls.length).toBe(2)
+    } finally {
+      rmSync(tmpFile, { force: true })
+    }
+  })
+  test("hands each caller its own copy of a cached result", async () => {
+    const tmpFile = join(tmpdir(), `tapir_meta_copy_${Date.now()}.mp3`)
+    writeFileSync(tmpFile, "audio")
+
+    mockSpawn({ stdout: PROBE_OUTPUT })
+
+    try {
+      const first = await getAudioMetadata(tmpFile)
+      first!.format!.duration = "99.0"
+      first!.streams = []
+
+      const second = await getAudioMetadata(tmpFile)
+      expect(second?.format?.duration).toBe("1.0")
+      expect(second?.streams).toBeUndefined()
+    } finally {
+      rmSync(tmpFile, { force: true })
+    }
+  })
 })
 
 // ============================================================================
@@ -227,32 +251,30 @@ describe("convertAudioFile", () => {
     } finally {
       rmSync(tmpFile, { force: true })
       // Clean up potential output file
-      try { rmSync(tmpFile.replace(".mp3", ".wav"), { force: true }) } catch {}
+      rmSync(tmpFile.replace(".mp3", ".wav"), { force: true })
     }
   })
 
-  test("handles bitrate option", async () => {
-    let capturedArgs: string[] = []
-    const originalSpawn = Bun.spawn
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(1), // fail so it doesn't try to read output file
-      }
-    }) as any
-
-    const tmpFile = join(tmpdir(), `tapir_conv_br_${Date.now()}.mp3`)
+  test.each([
+    ["wav", undefined, ["-c:a", "pcm_s16le"]],
+    ["flac", undefined, ["-c:a", "flac"]],
+    ["aac", 256, ["-c:a", "aac", "-b:a", "256k"]],
+    ["m4a", 320, ["-c:a", "aac", "-b:a", "320k"]],
+    ["ogg", undefined, ["-c:a", "libvorbis", "-b:a", "192k"]],
+  ] as const)("builds ffmpeg args for %s (bitrate %s)", async (format, bitrate, codecArgs) => {
+    // Fail so it doesn't try to read the output file
+    const calls = mockSpawn({ exitCode: 1 })
+
+    const tmpFile = join(tmpdir(), `tapir_conv_${format}_${Date.now()}.mp3`)
     writeFileSync(tmpFile, "fake")
 
     try {
-      await convertAudioFile({ inputFile: tmpFile, outputFormat: "aac", bitrate: 256 })
-      expect(capturedArgs).toContain("-b:a")
-      expect(capturedArgs).toContain("256k")
+      await convertAudioFile({ inputFile: tmpFile, outputFormat: format, bitrate })
+      // Everything between the input and the -y/output pair is codec options
+      const args = calls[0]
+      const codecAt = args.indexOf("-c:a")
+      expect(args.slice(codecAt, args.indexOf("-y"))).toEqual([...codecArgs])
     } finally {
-      Bun.spawn = originalSpawn
       rmSync(tmpFile, { force: true })
     }
   })
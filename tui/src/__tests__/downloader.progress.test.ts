@@ -1,8 +1,27 @@
 /**
  * Additional tests for services/downloader.ts - downloadVideoWithProgress and downloadParallel
  */
-import { describe, test, expect, beforeEach, afterEach } from "bun:test"
+import { describe, test, expect, beforeEach, afterEach, afterAll } from "bun:test"
+import { mkdtempSync, writeFileSync, rmSync } from "fs"
+import { join } from "path"
+import { tmpdir } from "os"
 import type { DownloadProgress } from "../types"
+import { mockSpawn } from "./helpers/spawn"
+
+import {
+  downloadVideoWithProgress,
+  downloadParallel,
+  downloadBatch,
+} from "../services/downloader"
+
+// Downloads are mocked, so the output directory is only ever a path string.
+// One absolute temp dir keeps getDownloadDirectory from creating folders in
+// the home directory and is created once for the whole file.
+const OUTPUT_DIR = mkdtempSync(join(tmpdir(), "tapir-dl-"))
+
+afterAll(() => {
+  rmSync(OUTPUT_DIR, { recursive: true, force: true })
+})
 
 let originalSpawn: typeof Bun.spawn
 
@@ -20,8 +39,6 @@ afterEach(() => {
 
 describe("downloadVideoWithProgress", () => {
   test("reports progress from stdout lines", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-
     const lines = [
       "[download] Destination: /tmp/video.mp4",
       "[download]  25.0% of  100.00MiB at  5.00MiB/s ETA 00:15",
@@ -30,24 +47,13 @@ describe("downloadVideoWithProgress", () => {
       '[Merger] Merging formats into "/tmp/video.mp4"',
     ]
 
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          for (const line of lines) {
-            c.enqueue(new TextEncoder().encode(line + "\n"))
-          }
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: lines.map((line) => line + "\n") })
 
     const progressUpdates: DownloadProgress[] = []
     const rawLines: string[] = []
 
     const result = await downloadVideoWithProgress(
-      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: "test" },
+      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: OUTPUT_DIR },
       (progress) => progressUpdates.push(progress),
       (line) => rawLines.push(line),
     )
@@ -67,21 +73,10 @@ describe("downloadVideoWithProgress", () => {
   })
 
   test("returns failure on non-zero exit code", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ERROR: Video unavailable"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "ERROR: Video unavailable", exitCode: 1 })
 
     const result = await downloadVideoWithProgress(
-      { url: "https://youtube.com/watch?v=bad", format: "best", outputDir: "test" },
+      { url: "https://youtube.com/watch?v=bad", format: "best", outputDir: OUTPUT_DIR },
       () => {},
     )
 
@@ -90,12 +85,10 @@ describe("downloadVideoWithProgress", () => {
   })
 
   test("handles exception gracefully", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-
-    Bun.spawn = (() => { throw new Error("spawn failed") }) as any
+    mockSpawn(() => { throw new Error("spawn failed") })
 
     const result = await downloadVideoWithProgress(
-      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: "test" },
+      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: OUTPUT_DIR },
       () => {},
     )
 
@@ -104,79 +97,59 @@ describe("downloadVideoWithProgress", () => {
   })
 
   test("includes subtitle flags in progress download", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
     await downloadVideoWithProgress(
       {
         url: "https://youtube.com/watch?v=test",
         format: "mp3",
-        outputDir: "test",
+        outputDir: OUTPUT_DIR,
         downloadSubs: true,
         subLangs: "en,es",
       },
       () => {},
     )
 
-    expect(capturedArgs).toContain("--write-subs")
-    expect(capturedArgs).toContain("--sub-langs")
-    expect(capturedArgs).toContain("en,es")
-    expect(capturedArgs).toContain("--newline")
+    expect(calls[0]).toContain("--write-subs")
+    expect(calls[0]).toContain("--sub-langs")
+    expect(calls[0]).toContain("en,es")
+    expect(calls[0]).toContain("--newline")
   })
 
-  test("handles all format types", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-
-    for (const fmt of ["mp3", "mp4", "high", "best", "bestvideo", "bestaudio", "custom_format_id"]) {
-      let capturedArgs: string[] = []
-      Bun.spawn = ((args: string[]) => {
-        capturedArgs = args
-        return {
-          stdout: new ReadableStream({ start(c) { c.close() } }),
-          stderr: new ReadableStream({ start(c) { c.close() } }),
-          exited: Promise.resolve(0),
-        }
-      }) as any
-
-      await downloadVideoWithProgress(
-        { url: "https://youtube.com/watch?v=test", format: fmt, outputDir: "test" },
-        () => {},
-      )
+  test.each([
+    ["mp3", "bestaudio/best"],
+    ["mp4", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"],
+    ["high", "bestvideo+bestaudio/best"],
+    ["best", "best"],
+    ["bestvideo", "bestvideo"],
+    ["bestaudio", "bestaudio"],
+    ["custom_format_id", "custom_format_id"],
+  ])("passes the right -f selector for %s format", async (format, selector) => {
+    const calls = mockSpawn()
 
-      expect(capturedArgs).toContain("-f")
-    }
+    await downloadVideoWithProgress(
+      { url: "https://youtube.com/watch?v=test", format, outputDir: OUTPUT_DIR },
+      () => {},
+    )
+
+    const capturedArgs = calls[0]
+    expect(capturedArgs[capturedArgs.indexOf("-f") + 1]).toBe(selector)
   })
 
   test("handles buffered partial lines", async () => {
-    const { downloadVideoWithProgress } = await import("../services/downloader")
-
     // Simulate data arriving in chunks that split lines
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("[download]  10"))
-          c.enqueue(new TextEncoder().encode(".0% of  50.00MiB at  2.00MiB/s ETA 00:22\n"))
-          c.enqueue(new TextEncoder().encode("[download] 100% of  50.00MiB in 00:25"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({
+      stdout: [
+        "[download]  10",
+        ".0% of  50.00MiB at  2.00MiB/s ETA 00:22\n",
+        "[download] 100% of  50.00MiB in 00:25",
+      ],
+    })
 
     const progressUpdates: DownloadProgress[] = []
 
     await downloadVideoWithProgress(
-      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: "test" },
+      { url: "https://youtube.com/watch?v=test", format: "best", outputDir: OUTPUT_DIR },
       (progress) => progressUpdates.push(progress),
     )
 
@@ -191,18 +164,12 @@ describe("downloadVideoWithProgress", () => {
 
 describe("downloadParallel", () => {
   test("downloads multiple URLs", async () => {
-    const { downloadParallel } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn()
 
     const results = await downloadParallel(
       ["https://example.com/1", "https://example.com/2"],
       "best",
-      "test_downloads",
+      OUTPUT_DIR,
       2,
     )
 
@@ -212,27 +179,12 @@ describe("downloadParallel", () => {
   })
 
   test("handles partial failures", async () => {
-    const { downloadParallel } = await import("../services/downloader")
-
-    let callCount = 0
-    Bun.spawn = ((args: string[]) => {
-      callCount++
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({
-          start(c) {
-            if (callCount === 2) c.enqueue(new TextEncoder().encode("error"))
-            c.close()
-          },
-        }),
-        exited: Promise.resolve(callCount === 2 ? 1 : 0),
-      }
-    }) as any
+    mockSpawn([{}, { stderr: "error", exitCode: 1 }])
 
     const results = await downloadParallel(
       ["https://example.com/1", "https://example.com/2"],
       "best",
-      "test_downloads",
+      OUTPUT_DIR,
       4,
     )
 
@@ -242,21 +194,142 @@ describe("downloadParallel", () => {
   })
 
   test("respects max workers limit", async () => {
-    const { downloadParallel } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn()
 
     const results = await downloadParallel(
       ["url1", "url2", "url3", "url4", "url5"],
       "best",
-      "test",
+      OUTPUT_DIR,
       2,
     )
 
     expect(results.length).toBe(5)
   })
+
+  test("spawns one yt-dlp process per worker, not per URL", async () => {
+    const spawned = mockSpawn()
+
+    const urls = ["url1", "url2", "url3", "url4", "url5"]
+    const results = await downloadParallel(urls, "best", OUTPUT_DIR, 2)
+
+    expect(spawned.length).toBe(2)
+    expect(spawned[0]).toContain("url1")
+    expect(spawned[0]).toContain("url3")
+    expect(spawned[1]).toContain("url5")
+    expect(results.map((r) => r.url)).toEqual(urls)
+  })
+
+  test("returns one result per input URL, duplicates included", async () => {
+    mockSpawn()
+
+    const urls = ["https://vimeo.com/1", "https://vimeo.com/2", "https://vimeo.com/1"]
+    const results = await downloadParallel(urls, "best", OUTPUT_DIR, 2)
+
+    expect(results.map((r) => r.url)).toEqual(urls)
+  })
+
+  test("skips URLs already recorded in the archive file", async () => {
+    const dir = mkdtempSync(join(tmpdir(), "tapir-archive-"))
+    const archive = join(dir, "archive.txt")
+    writeFileSync(archive, "youtube dQw4w9WgXcQ\n")
+
+    const spawned = mockSpawn()
+
+    try {
+      const urls = ["https://youtu.be/dQw4w9WgXcQ", "https://youtube.com/watch?v=abcdefghijk"]
+      const results = await downloadParallel(urls, "best", OUTPUT_DIR, 2, undefined, undefined, archive)
+
+      expect(spawned.length).toBe(1)
+      expect(spawned[0]).not.toContain(urls[0])
+      expect(results.map((r) => r.url)).toEqual(urls)
+      expect(results[0].message).toBe("Already in download archive")
+      expect(results[1].success).toBe(true)
+    } finally {
+      rmSync(dir, { recursive: true, force: true })
+    }
+  })
+})
+
+// ============================================================================
+// downloadBatch
+// ============================================================================
+
+describe("downloadBatch", () => {
+  test("reports per-URL results from printed URLs", async () => {
+    const calls = mockSpawn({
+      stdout: "Generic 1 https://example.com/1\n",
+      stderr: "ERROR: unavailable",
+      exitCode: 1,
+    })
+
+    const results = await downloadBatch(
+      ["https://example.com/1", "https://example.com/2"],
+      { format: "best", outputDir: OUTPUT_DIR },
+    )
+
+    expect(calls[0]).toContain("--ignore-errors")
+    expect(calls[0]).toContain("after_move:%(extractor_key)s %(id)s %(original_url)s")
+    expect(results[0].success).toBe(true)
+    expect(results[1].success).toBe(false)
+    expect(results[1].message).toBe("ERROR: unavailable")
+  })
+
+  test("matches normalized YouTube URLs on the video id", async () => {
+    // yt-dlp reports the canonical watch URL, not the youtu.be link it was given
+    mockSpawn({
+      stdout: "Youtube dQw4w9WgXcQ https://www.youtube.com/watch?v=dQw4w9WgXcQ\n",
+      stderr: "ERROR: [youtube] abcdefghijk: Video unavailable",
+      exitCode: 1,
+    })
+
+    const results = await downloadBatch(
+      ["https://youtu.be/dQw4w9WgXcQ?si=share", "https://youtube.com/watch?v=abcdefghijk"],
+      { format: "best", outputDir: OUTPUT_DIR },
+    )
+
+    expect(results[0].success).toBe(true)
+    expect(results[1].success).toBe(false)
+  })
+
+  test("counts URLs skipped by the archive as done", async () => {
+    const dir = mkdtempSync(join(tmpdir(), "tapir-archive-"))
+    const archive = join(dir, "archive.txt")
+    writeFileSync(archive, "youtube dQw4w9WgXcQ\n")
+    mockSpawn({ stderr: "ERROR: [youtube] abcdefghijk: Video unavailable", exitCode: 1 })
+
+    try {
+      const results = await downloadBatch(
+        ["https://youtu.be/dQw4w9WgXcQ", "https://youtube.com/watch?v=abcdefghijk"],
+        { format: "best", outputDir: OUTPUT_DIR, archiveFile: archive },
+      )
+
+      expect(results[0].success).toBe(true)
+      expect(results[0].message).toBe("Already in download archive")
+      expect(results[1].success).toBe(false)
+    } finally {
+      rmSync(dir, { recursive: true, force: true })
+    }
+  })
+
+  test("gives each failed URL only its own error lines", async () => {
+    mockSpawn({
+      stderr: [
+        "ERROR: [youtube] aaaaaaaaaaa: Video unavailable",
+        "ERROR: [youtube] bbbbbbbbbbb: Private video",
+      ].join("\n"),
+      exitCode: 1,
+    })
+
+    const results = await downloadBatch(
+      ["https://youtube.com/watch?v=aaaaaaaaaaa", "https://youtube.com/watch?v=bbbbbbbbbbb"],
+      { format: "best", outputDir: OUTPUT_DIR },
+    )
+
+    expect(results[0].message).toBe("ERROR: [youtube] aaaaaaaaaaa: Video unavailable")
+    expect(results[1].message).toBe("ERROR: [youtube] bbbbbbbbbbb: Private video")
+  })
+
+  test("returns empty list for no URLs", async () => {
+    expect(await downloadBatch([], { format: "best", outputDir: OUTPUT_DIR })).toEqual([])
+  })
 })
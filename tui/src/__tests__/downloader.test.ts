@@ -1,10 +1,63 @@
 /**
  * Tests for services/downloader.ts - progress parsing, search, download logic
  */
-import { describe, test, expect, mock, spyOn, beforeEach, afterEach } from "bun:test"
+import { describe, test, expect, beforeEach, afterEach, afterAll } from "bun:test"
+import { mkdtempSync, rmSync } from "fs"
+import { join } from "path"
+import { tmpdir } from "os"
+
+import {
+  parseProgressLine,
+  groupFormats,
+  downloadVideo,
+  searchYouTube,
+  getVideoInfo,
+  resolvePlaylistEntry,
+  listFormats,
+  clearVideoInfoCache,
+} from "../services/downloader"
+import type { DownloadOptions } from "../types"
+import { mockSpawn } from "./helpers/spawn"
+
+// Shared request fixtures
+const VIDEO_URL = "https://youtube.com/watch?v=test"
+// Downloads are mocked, so this is only a path string; keep it under the
+// temp dir rather than letting getDownloadDirectory create ~/test_downloads
+const OUTPUT_DIR = mkdtempSync(join(tmpdir(), "tapir-dl-"))
+// A single video's --dump-json record, and the line yt-dlp prints for it
+const BASIC_INFO = { title: "Test", channel: "Ch", duration: 120 }
+const INFO_LINE = JSON.stringify(BASIC_INFO) + "\n"
+// One combined, one video-only and one audio-only format
+const FORMATS_INFO = {
+  title: "Test",
+  formats: [
+    { format_id: "1", ext: "mp4", vcodec: "h264", acodec: "aac", height: 720, tbr: 1000 },
+    { format_id: "2", ext: "mp4", vcodec: "h264", acodec: "none", height: 1080, tbr: 2000 },
+    { format_id: "3", ext: "m4a", vcodec: "none", acodec: "aac", tbr: 128 },
+  ],
+}
+
+// Options for a plain single-video download; tests override what they exercise
+function downloadOptions(overrides: Partial<DownloadOptions> = {}): DownloadOptions {
+  return { url: VIDEO_URL, format: "best", outputDir: OUTPUT_DIR, ...overrides }
+}
+
+// Every spawn-mocking test restores the real Bun.spawn afterwards, and info
+// lookups start from an empty cache so mocked responses are not shadowed.
+let originalSpawn: typeof Bun.spawn
+
+beforeEach(() => {
+  originalSpawn = Bun.spawn
+  clearVideoInfoCache()
+})
+
+afterEach(() => {
+  Bun.spawn = originalSpawn
+})
 
-import { parseProgressLine } from "../services/downloader"
-import type { DownloadProgress } from "../types"
+afterAll(() => {
+  rmSync(OUTPUT_DIR, { recursive: true, force: true })
+})
 
 // ============================================================================
 // parseProgressLine - pure function, extensive testing
@@ -46,57 +99,19 @@ describe("parseProgressLine", () => {
     expect(result.totalSize).toBe("250.00MiB")
   })
 
-  test("detects destination line", () => {
-    const line = "[download] Destination: /home/user/video.mp4"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("downloading")
-    expect(result.percent).toBe(0)
-  })
-
-  test("detects merger phase", () => {
-    const line = '[Merger] Merging formats into "/home/user/video.mp4"'
+  test.each([
+    ["[download] Destination: /home/user/video.mp4", "downloading", 0],
+    ['[Merger] Merging formats into "/home/user/video.mp4"', "merging", 100],
+    ["Merging formats into output.mp4", "merging", 100],
+    ["[ExtractAudio] Destination: /home/user/audio.mp3", "post_processing", 100],
+    ["Post-process file /home/user/video.mp4", "post_processing", 100],
+    ["[info] Writing video subtitles to: /home/user/video.en.srt", "subtitles", 100],
+    ["[download] Writing video subtitles to: /home/user/video.en.srt", "subtitles", 100],
+    ["[download] video.mp4 has already been downloaded", "done", 100],
+  ])("classifies %s as %s", (line, phase, percent) => {
     const result = parseProgressLine(line)
-    expect(result.phase).toBe("merging")
-    expect(result.percent).toBe(100)
-  })
-
-  test("detects merging formats text", () => {
-    const line = "Merging formats into output.mp4"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("merging")
-  })
-
-  test("detects ExtractAudio phase", () => {
-    const line = '[ExtractAudio] Destination: /home/user/audio.mp3'
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("post_processing")
-    expect(result.percent).toBe(100)
-  })
-
-  test("detects Post-process line", () => {
-    const line = "Post-process file /home/user/video.mp4"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("post_processing")
-  })
-
-  test("detects subtitle writing", () => {
-    const line = "[info] Writing video subtitles to: /home/user/video.en.srt"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("subtitles")
-    expect(result.percent).toBe(100)
-  })
-
-  test("detects download writing subtitles", () => {
-    const line = "[download] Writing video subtitles to: /home/user/video.en.srt"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("subtitles")
-  })
-
-  test("detects already downloaded", () => {
-    const line = "[download] video.mp4 has already been downloaded"
-    const result = parseProgressLine(line)
-    expect(result.phase).toBe("done")
-    expect(result.percent).toBe(100)
+    expect(result.phase).toBe(phase)
+    expect(result.percent).toBe(percent)
   })
 
   test("returns downloading with -1 percent for unknown lines", () => {
@@ -133,39 +148,12 @@ describe("parseProgressLine", () => {
 // ============================================================================
 
 describe("downloadVideo", () => {
-  let originalSpawn: typeof Bun.spawn
-
-  beforeEach(() => {
-    originalSpawn = Bun.spawn
-  })
-
-  afterEach(() => {
-    Bun.spawn = originalSpawn
-  })
-
   test("builds correct args for mp3 format", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        stderr: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "mp3",
-      outputDir: "test_downloads",
-    })
+    await downloadVideo(downloadOptions({ format: "mp3" }))
 
+    const capturedArgs = calls[0]
     expect(capturedArgs).toContain("yt-dlp")
     expect(capturedArgs).toContain("-f")
     expect(capturedArgs).toContain("bestaudio/best")
@@ -174,58 +162,28 @@ describe("downloadVideo", () => {
     expect(capturedArgs).toContain("mp3")
   })
 
-  test("builds correct args for mp4 format", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        stderr: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+  test.each([
+    ["mp4", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"],
+    ["high", "bestvideo+bestaudio/best"],
+    ["best", "best"],
+    ["bestvideo", "bestvideo"],
+    ["bestaudio", "bestaudio"],
+    ["custom_id", "custom_id"],
+  ])("passes the right -f selector for %s format", async (format, selector) => {
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "mp4",
-      outputDir: "test_downloads",
-    })
+    await downloadVideo(downloadOptions({ format }))
 
-    expect(capturedArgs).toContain("-f")
-    expect(capturedArgs).toContain("bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best")
+    const capturedArgs = calls[0]
+    expect(capturedArgs[capturedArgs.indexOf("-f") + 1]).toBe(selector)
   })
 
   test("includes subtitle flags when downloadSubs is true", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        stderr: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "best",
-      outputDir: "test_downloads",
-      downloadSubs: true,
-      subLangs: "en,fr",
-    })
+    await downloadVideo(downloadOptions({ downloadSubs: true, subLangs: "en,fr" }))
 
+    const capturedArgs = calls[0]
     expect(capturedArgs).toContain("--write-subs")
     expect(capturedArgs).toContain("--write-auto-subs")
     expect(capturedArgs).toContain("--sub-format")
@@ -235,166 +193,68 @@ describe("downloadVideo", () => {
   })
 
   test("uses default sub-langs when not specified", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        stderr: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "best",
-      outputDir: "test_downloads",
-      downloadSubs: true,
-    })
+    await downloadVideo(downloadOptions({ downloadSubs: true }))
 
-    expect(capturedArgs).toContain("--sub-langs")
-    expect(capturedArgs).toContain("en.*,en")
+    expect(calls[0]).toContain("--sub-langs")
+    expect(calls[0]).toContain("en.*,en")
   })
 
   test("includes playlist flags", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        stderr: new ReadableStream({
-          start(controller) { controller.close() },
-        }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/playlist?list=test",
-      format: "best",
-      outputDir: "test_downloads",
-      isPlaylist: true,
-    })
+    await downloadVideo(
+      downloadOptions({
+        url: "https://youtube.com/playlist?list=test",
+        isPlaylist: true,
+      }),
+    )
 
-    expect(capturedArgs).toContain("--ignore-errors")
-    expect(capturedArgs).toContain("--download-archive")
+    expect(calls[0]).toContain("--ignore-errors")
+    expect(calls[0]).toContain("--download-archive")
   })
 
   test("returns success on exit code 0", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
-
-    const result = await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "best",
-      outputDir: "test_downloads",
-    })
+    mockSpawn()
+
+    const result = await downloadVideo(downloadOptions())
 
     expect(result.success).toBe(true)
-    expect(result.url).toBe("https://youtube.com/watch?v=test")
+    expect(result.url).toBe(VIDEO_URL)
   })
 
   test("returns failure on non-zero exit code", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ERROR: Video unavailable"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "ERROR: Video unavailable", exitCode: 1 })
 
-    const result = await downloadVideo({
-      url: "https://youtube.com/watch?v=bad",
-      format: "best",
-      outputDir: "test_downloads",
-    })
+    const result = await downloadVideo(downloadOptions({ url: "https://youtube.com/watch?v=bad" }))
 
     expect(result.success).toBe(false)
     expect(result.message).toContain("ERROR")
   })
 
   test("handles spawn exception", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-
     Bun.spawn = (() => {
       throw new Error("spawn failed")
     }) as any
 
-    const result = await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "best",
-      outputDir: "test_downloads",
-    })
+    const result = await downloadVideo(downloadOptions())
 
     expect(result.success).toBe(false)
     expect(result.message).toContain("Download error")
   })
 
-  test("handles high and bestvideo and bestaudio formats", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-
-    for (const fmt of ["high", "bestvideo", "bestaudio", "best", "custom_id"]) {
-      let capturedArgs: string[] = []
-      Bun.spawn = ((args: string[]) => {
-        capturedArgs = args
-        return {
-          stdout: new ReadableStream({ start(c) { c.close() } }),
-          stderr: new ReadableStream({ start(c) { c.close() } }),
-          exited: Promise.resolve(0),
-        }
-      }) as any
-
-      await downloadVideo({
-        url: "https://youtube.com/watch?v=test",
-        format: fmt,
-        outputDir: "test_downloads",
-      })
-
-      expect(capturedArgs).toContain("-f")
-    }
-  })
-
   test("includes cookies flags when provided", async () => {
-    const { downloadVideo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[]) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
-    await downloadVideo({
-      url: "https://youtube.com/watch?v=test",
-      format: "best",
-      outputDir: "test_downloads",
-      cookiesFile: "/path/cookies.txt",
-      cookiesFromBrowser: "chrome",
-    })
+    await downloadVideo(
+      downloadOptions({
+        cookiesFile: "/path/cookies.txt",
+        cookiesFromBrowser: "chrome",
+      }),
+    )
 
+    const capturedArgs = calls[0]
     expect(capturedArgs).toContain("--cookies")
     expect(capturedArgs).toContain("/path/cookies.txt")
     expect(capturedArgs).toContain("--cookies-from-browser")
@@ -407,19 +267,7 @@ describe("downloadVideo", () => {
 // ============================================================================
 
 describe("searchYouTube", () => {
-  let originalSpawn: typeof Bun.spawn
-
-  beforeEach(() => {
-    originalSpawn = Bun.spawn
-  })
-
-  afterEach(() => {
-    Bun.spawn = originalSpawn
-  })
-
   test("parses search results correctly", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-
     const mockResult = JSON.stringify({
       id: "abc123",
       title: "Test Video",
@@ -430,16 +278,7 @@ describe("searchYouTube", () => {
       description: "Test description",
     })
 
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(mockResult + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: mockResult + "\n" })
 
     const results = await searchYouTube("test query", 5)
     expect(results.length).toBe(1)
@@ -451,21 +290,13 @@ describe("searchYouTube", () => {
   })
 
   test("returns empty array on failure", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ exitCode: 1 })
 
     const results = await searchYouTube("test query")
     expect(results).toEqual([])
   })
 
   test("handles spawn exception", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-
     Bun.spawn = (() => { throw new Error("fail") }) as any
 
     const results = await searchYouTube("test")
@@ -473,20 +304,9 @@ describe("searchYouTube", () => {
   })
 
   test("handles malformed JSON lines gracefully", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-
     const validLine = JSON.stringify({ id: "a", title: "T", channel: "C", duration: 60, view_count: 100 })
 
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("not json\n" + validLine + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "not json\n" + validLine + "\n" })
 
     const results = await searchYouTube("test")
     expect(results.length).toBe(1)
@@ -494,27 +314,16 @@ describe("searchYouTube", () => {
   })
 
   test("builds correct ytsearch argument", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[]) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn()
 
     await searchYouTube("lofi beats", 15)
+    const capturedArgs = calls[0]
     expect(capturedArgs).toContain("ytsearch15:lofi beats")
     expect(capturedArgs).toContain("--flat-playlist")
     expect(capturedArgs).toContain("--dump-json")
   })
 
   test("constructs URL from id when url/webpage_url missing", async () => {
-    const { searchYouTube } = await import("../services/downloader")
-
     const mockResult = JSON.stringify({
       id: "xyz789",
       title: "No URL Video",
@@ -523,16 +332,7 @@ describe("searchYouTube", () => {
       view_count: 5,
     })
 
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(mockResult + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: mockResult + "\n" })
 
     const results = await searchYouTube("test")
     expect(results[0].url).toBe("https://www.youtube.com/watch?v=xyz789")
@@ -544,53 +344,20 @@ describe("searchYouTube", () => {
 // ============================================================================
 
 describe("getVideoInfo", () => {
-  let originalSpawn: typeof Bun.spawn
-
-  beforeEach(() => {
-    originalSpawn = Bun.spawn
-  })
-
-  afterEach(() => {
-    Bun.spawn = originalSpawn
-  })
-
   test("parses single video info", async () => {
-    const { getVideoInfo } = await import("../services/downloader")
-
-    const info = { title: "Test", channel: "Ch", duration: 120 }
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(JSON.stringify(info) + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: INFO_LINE })
 
-    const result = await getVideoInfo("https://youtube.com/watch?v=test")
+    const result = await getVideoInfo(VIDEO_URL)
     expect(result).not.toBeNull()
     expect(result!.title).toBe("Test")
     expect(result!.channel).toBe("Ch")
   })
 
   test("parses playlist info (multiple lines)", async () => {
-    const { getVideoInfo } = await import("../services/downloader")
-
     const entry1 = JSON.stringify({ title: "Video 1", channel: "Ch" })
     const entry2 = JSON.stringify({ title: "Video 2", channel: "Ch" })
 
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(entry1 + "\n" + entry2 + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: entry1 + "\n" + entry2 + "\n" })
 
     const result = await getVideoInfo("https://youtube.com/playlist?list=test")
     expect(result).not.toBeNull()
@@ -599,90 +366,105 @@ describe("getVideoInfo", () => {
   })
 
   test("returns null on failure", async () => {
-    const { getVideoInfo } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ exitCode: 1 })
 
     const result = await getVideoInfo("https://youtube.com/watch?v=bad")
     expect(result).toBeNull()
   })
 
   test("returns null on exception", async () => {
-    const { getVideoInfo } = await import("../services/downloader")
     Bun.spawn = (() => { throw new Error("fail") }) as any
-    const result = await getVideoInfo("https://youtube.com/watch?v=test")
+    const result = await getVideoInfo(VIDEO_URL)
     expect(result).toBeNull()
   })
 
   test("includes cookies args when provided", async () => {
-    const { getVideoInfo } = await import("../services/downloader")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[]) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({
-          start(c) {
-            c.enqueue(new TextEncoder().encode(JSON.stringify({ title: "T" }) + "\n"))
-            c.close()
-          },
-        }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    const calls = mockSpawn({ stdout: INFO_LINE })
 
-    await getVideoInfo("https://youtube.com/watch?v=test", "/path/cookies.txt", "firefox")
+    await getVideoInfo(VIDEO_URL, "/path/cookies.txt", "firefox")
+    const capturedArgs = calls[0]
     expect(capturedArgs).toContain("--cookies")
     expect(capturedArgs).toContain("/path/cookies.txt")
     expect(capturedArgs).toContain("--cookies-from-browser")
     expect(capturedArgs).toContain("firefox")
   })
-})
 
-// ============================================================================
-// listFormats
-// ============================================================================
+  test("lists playlists flat and single videos in full", async () => {
+    const captured = mockSpawn({ stdout: INFO_LINE })
 
-describe("listFormats", () => {
-  let originalSpawn: typeof Bun.spawn
+    await getVideoInfo("https://youtube.com/playlist?list=PL123")
+    await getVideoInfo("https://youtube.com/watch?v=single")
+    expect(captured[0]).toContain("--flat-playlist")
+    expect(captured[1]).not.toContain("--flat-playlist")
+  })
+
+  test("resolvePlaylistEntry fetches full info only for flat entries", async () => {
+    const calls = mockSpawn({ stdout: JSON.stringify({ title: "Full", formats: [] }) + "\n" })
+
+    const full = { title: "Already full", formats: [] }
+    expect(await resolvePlaylistEntry(full, "https://youtube.com/watch?v=a")).toBe(full)
+    expect(calls.length).toBe(0)
+
+    const resolved = await resolvePlaylistEntry({ title: "Flat" }, "https://youtube.com/watch?v=b")
+    expect(resolved.title).toBe("Full")
+    expect(calls.length).toBe(1)
+  })
+
+  test("resolvePlaylistEntry passes cookie options through", async () => {
+    const calls = mockSpawn({ stdout: JSON.stringify({ title: "Private", formats: [] }) + "\n" })
+
+    await resolvePlaylistEntry({ title: "Flat" }, "https://youtube.com/watch?v=c", "/path/cookies.txt", "firefox")
+    expect(calls[0]).toContain("/path/cookies.txt")
+    expect(calls[0]).toContain("firefox")
+  })
+
+  test("caches results across equivalent YouTube URLs", async () => {
+    const calls = mockSpawn({ stdout: JSON.stringify({ title: "Cached" }) + "\n" })
+
+    const first = await getVideoInfo("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    const second = await getVideoInfo("https://youtu.be/dQw4w9WgXcQ")
+    expect(first!.title).toBe("Cached")
+    expect(second).toEqual(first)
+    expect(calls.length).toBe(1)
+  })
+
+  test("hands each caller its own copy of a cached result", async () => {
+    mockSpawn({ stdout: JSON.stringify({ title: "Cached" }) + "\n" })
+
+    const first = await getVideoInfo(VIDEO_URL)
+    first!.title = "Changed by caller"
+    const second = await getVideoInfo(VIDEO_URL)
+    expect(second).not.toBe(first)
+    expect(second!.title).toBe("Cached")
+  })
+
+  test("does not cache playlist listings", async () => {
+    const calls = mockSpawn({ stdout: INFO_LINE + INFO_LINE })
 
-  beforeEach(() => {
-    originalSpawn = Bun.spawn
+    const first = await getVideoInfo("https://youtube.com/playlist?list=PL123")
+    await getVideoInfo("https://youtube.com/playlist?list=PL123")
+    expect(first!._type).toBe("playlist")
+    expect(calls.length).toBe(2)
   })
 
-  afterEach(() => {
-    Bun.spawn = originalSpawn
+  test("does not cache failures", async () => {
+    const calls = mockSpawn({ exitCode: 1 })
+
+    await getVideoInfo("https://youtube.com/watch?v=bad")
+    await getVideoInfo("https://youtube.com/watch?v=bad")
+    expect(calls.length).toBe(2)
   })
+})
+
+// ============================================================================
+// listFormats
+// ============================================================================
 
+describe("listFormats", () => {
   test("categorizes formats correctly", async () => {
-    const { listFormats } = await import("../services/downloader")
-
-    const info = {
-      title: "Test",
-      formats: [
-        { format_id: "1", ext: "mp4", vcodec: "h264", acodec: "aac", height: 720, tbr: 1000 },
-        { format_id: "2", ext: "mp4", vcodec: "h264", acodec: "none", height: 1080, tbr: 2000 },
-        { format_id: "3", ext: "m4a", vcodec: "none", acodec: "aac", tbr: 128 },
-      ],
-    }
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(JSON.stringify(info) + "\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: JSON.stringify(FORMATS_INFO) + "\n" })
 
-    const result = await listFormats("https://youtube.com/watch?v=test")
+    const result = await listFormats(VIDEO_URL)
     expect(result).not.toBeNull()
     expect(result!.combined.length).toBe(1)
     expect(result!.videoOnly.length).toBe(1)
@@ -690,15 +472,41 @@ describe("listFormats", () => {
   })
 
   test("returns null when info fetch fails", async () => {
-    const { listFormats } = await import("../services/downloader")
-
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ exitCode: 1 })
 
     const result = await listFormats("https://youtube.com/watch?v=bad")
     expect(result).toBeNull()
   })
 })
+
+// ============================================================================
+// groupFormats
+// ============================================================================
+
+describe("groupFormats", () => {
+  test("groups and sorts formats in one call", () => {
+    const result = groupFormats([
+      { format_id: "a", ext: "m4a", vcodec: "none", acodec: "aac", tbr: 64 },
+      { format_id: "b", ext: "mp4", vcodec: "h264", acodec: "aac", height: 360 },
+      { format_id: "c", ext: "mp4", vcodec: "h264", acodec: "aac", height: 720 },
+      { format_id: "d", ext: "m4a", vcodec: "none", acodec: "aac", tbr: 128 },
+      { format_id: "e", ext: "mhtml", vcodec: "none", acodec: "none" },
+    ])
+    expect(result.combined.map((f) => f.format_id)).toEqual(["c", "b"])
+    expect(result.videoOnly.length).toBe(0)
+    expect(result.audioOnly.map((f) => f.format_id)).toEqual(["d", "a"])
+  })
+
+  test("puts one of each stream kind in its own bucket", () => {
+    const result = groupFormats(FORMATS_INFO.formats)
+    expect(result.combined.map((f) => f.format_id)).toEqual(["1"])
+    expect(result.videoOnly.map((f) => f.format_id)).toEqual(["2"])
+    expect(result.audioOnly.map((f) => f.format_id)).toEqual(["3"])
+  })
+
+  test("treats missing codecs as absent streams", () => {
+    const result = groupFormats([{ format_id: "x", ext: "mp4", vcodec: "h264" }])
+    expect(result.videoOnly.length).toBe(1)
+    expect(result.combined.length).toBe(0)
+  })
+})
@@ -0,0 +1,60 @@
+/**
+ * Shared Bun.spawn stub for service tests
+ */
+import type { Subprocess } from "bun"
+
+// The parts of a spawned process the code under test reads. Typing stubs
+// against it catches misspelled or missing fields at typecheck time.
+export type SpawnStub = Pick<Subprocess<"ignore", "pipe", "pipe">, "stdout" | "stderr" | "exited" | "kill">
+
+export interface SpawnResponse {
+  /** Whole output, or a list of chunks delivered one by one */
+  stdout?: string | string[]
+  stderr?: string
+  exitCode?: number
+  /** Keep both streams open and the exit pending until this settles */
+  until?: Promise<unknown>
+}
+
+/** Picks the reply for each spawn; `call` counts from 0. May throw to fail the spawn. */
+export type SpawnHandler = (args: string[], call: number) => SpawnResponse
+
+const encoder = new TextEncoder()
+
+function textStream(text: string | string[] | undefined, until?: Promise<unknown>): ReadableStream<Uint8Array> {
+  const chunks = text === undefined ? [] : Array.isArray(text) ? text : [text]
+  return new ReadableStream({
+    async start(c) {
+      for (const chunk of chunks) if (chunk) c.enqueue(encoder.encode(chunk))
+      if (until) await until.catch(() => {})
+      c.close()
+    },
+  })
+}
+
+/**
+ * Install a Bun.spawn stub that records each argv and replies with the given
+ * output. A single response answers every command; a list answers calls in
+ * order and fails (exit 1) once it runs out; a handler picks per call.
+ * Returns the captured argv list.
+ *
+ * Callers restore the original Bun.spawn in their own afterEach.
+ */
+export function mockSpawn(resp: SpawnResponse | SpawnResponse[] | SpawnHandler = {}): string[][] {
+  const calls: string[][] = []
+  Bun.spawn = ((args: string[]): SpawnStub => {
+    const call = calls.push(args) - 1
+    const r =
+      typeof resp === "function" ? resp(args, call)
+      : Array.isArray(resp) ? (resp[call] ?? { exitCode: 1 })
+      : resp
+    const exitCode = r.exitCode ?? 0
+    return {
+      stdout: textStream(r.stdout, r.until),
+      stderr: textStream(r.stderr, r.until),
+      exited: r.until ? r.until.then(() => exitCode, () => exitCode) : Promise.resolve(exitCode),
+      kill() {},
+    }
+  }) as any
+  return calls
+}
@@ -2,41 +2,55 @@
  * Additional tests for services/metadata.ts - mocked embedMetadata paths
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { writeFileSync, rmSync, existsSync, renameSync, mkdirSync } from "fs"
-import { join, extname } from "path"
+import { writeFileSync, rmSync, existsSync } from "fs"
+import { join } from "path"
 import { tmpdir } from "os"
 
 import { embedMetadata, extractMetadata } from "../services/metadata"
+import { mockSpawn } from "./helpers/spawn"
 
 let originalSpawn: typeof Bun.spawn
+let originalFetch: typeof globalThis.fetch
 
 beforeEach(() => {
   originalSpawn = Bun.spawn
+  originalFetch = globalThis.fetch
 })
 
 afterEach(() => {
   Bun.spawn = originalSpawn
+  globalThis.fetch = originalFetch
 })
 
+// Stand in for a successful ffmpeg run: write whatever output file it was
+// asked for (the temp metadata copy or a converted thumbnail) and exit 0.
+// Returns the captured argv list.
+function mockFfmpeg(): string[][] {
+  return mockSpawn((args) => {
+    const outFile = args[args.length - 1]
+    if (outFile.includes(".tapir-meta-") || outFile.endsWith(".jpg")) {
+      writeFileSync(outFile, "ffmpeg output")
+    }
+    return {}
+  })
+}
+
+// Serve a thumbnail download with the given content type; null stands in
+// for a failed (non-2xx) response.
+function mockThumbnailFetch(contentType: string | null): void {
+  globalThis.fetch = (async () => ({
+    ok: contentType !== null,
+    headers: new Headers(contentType ? { "content-type": contentType } : {}),
+    arrayBuffer: async () => new ArrayBuffer(contentType ? 50 : 0),
+  })) as any
+}
+
 describe("embedMetadata with mocked ffmpeg", () => {
   test("embeds title and artist successfully", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_${Date.now()}.mp4`)
-    const tmpOutput = join(tmpdir(), `.tapir-meta-${Date.now()}-tapir_emb_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video content")
 
-    // Mock Bun.spawn to simulate successful ffmpeg
-    Bun.spawn = ((args: string[], opts?: any) => {
-      // Simulate ffmpeg creating the output file
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string" && outFile.includes(".tapir-meta-")) {
-        writeFileSync(outFile, "processed video content")
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockFfmpeg()
 
     const result = await embedMetadata(tmpFile, {
       title: "Test Title",
@@ -52,23 +66,14 @@ describe("embedMetadata with mocked ffmpeg", () => {
     expect(result.message).toContain("Test Artist")
 
     // Clean up
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 
   test("handles ffmpeg failure gracefully", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_fail_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video content")
 
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ffmpeg error: invalid input"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "ffmpeg error: invalid input", exitCode: 1 })
 
     const result = await embedMetadata(tmpFile, { title: "Test" })
     expect(result.success).toBe(false)
@@ -83,7 +88,7 @@ describe("embedMetadata with mocked ffmpeg", () => {
     const tmpFile = join(tmpdir(), `tapir_emb_exc_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video content")
 
-    Bun.spawn = (() => { throw new Error("spawn crashed") }) as any
+    mockSpawn(() => { throw new Error("spawn crashed") })
 
     const result = await embedMetadata(tmpFile, { title: "Test" })
     expect(result.success).toBe(false)
@@ -96,26 +101,9 @@ describe("embedMetadata with mocked ffmpeg", () => {
     const tmpFile = join(tmpdir(), `tapir_emb_thumb_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video")
 
-    // Mock fetch for thumbnail download
-    const origFetch = globalThis.fetch
-    globalThis.fetch = (async (url: string | Request | URL) => ({
-      ok: true,
-      headers: new Headers({ "content-type": "image/jpeg" }),
-      arrayBuffer: async () => new ArrayBuffer(100),
-    })) as any
-
-    // Mock Bun.spawn
-    Bun.spawn = ((args: string[], opts?: any) => {
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string" && outFile.includes(".tapir-meta-")) {
-        writeFileSync(outFile, "output with thumb")
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockThumbnailFetch("image/jpeg")
+
+    mockFfmpeg()
 
     const result = await embedMetadata(
       tmpFile,
@@ -130,34 +118,16 @@ describe("embedMetadata with mocked ffmpeg", () => {
     expect(result.success).toBe(true)
     expect(result.message).toContain("thumbnail")
 
-    globalThis.fetch = origFetch
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 
   test("embeds metadata into mp3 file with ID3 version", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_mp3_${Date.now()}.mp3`)
     writeFileSync(tmpFile, "fake audio")
 
-    const origFetch = globalThis.fetch
-    globalThis.fetch = (async () => ({
-      ok: true,
-      headers: new Headers({ "content-type": "image/jpeg" }),
-      arrayBuffer: async () => new ArrayBuffer(50),
-    })) as any
-
-    let capturedArgs: string[] = []
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string" && outFile.includes(".tapir-meta-")) {
-        writeFileSync(outFile, "tagged mp3")
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockThumbnailFetch("image/jpeg")
+
+    const calls = mockFfmpeg()
 
     await embedMetadata(
       tmpFile,
@@ -165,35 +135,20 @@ describe("embedMetadata with mocked ffmpeg", () => {
       { embedThumbnail: true },
     )
 
-    expect(capturedArgs).toContain("-id3v2_version")
-    expect(capturedArgs).toContain("3")
+    const embedArgs = calls[calls.length - 1]
+    expect(embedArgs).toContain("-id3v2_version")
+    expect(embedArgs).toContain("3")
 
-    globalThis.fetch = origFetch
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 
   test("embeds metadata into mkv file", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_mkv_${Date.now()}.mkv`)
     writeFileSync(tmpFile, "fake mkv")
 
-    const origFetch = globalThis.fetch
-    globalThis.fetch = (async () => ({
-      ok: true,
-      headers: new Headers({ "content-type": "image/png" }),
-      arrayBuffer: async () => new ArrayBuffer(50),
-    })) as any
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string" && outFile.includes(".tapir-meta-")) {
-        writeFileSync(outFile, "tagged mkv")
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockThumbnailFetch("image/png")
+
+    mockFfmpeg()
 
     const result = await embedMetadata(
       tmpFile,
@@ -203,37 +158,16 @@ describe("embedMetadata with mocked ffmpeg", () => {
 
     expect(result.success).toBe(true)
 
-    globalThis.fetch = origFetch
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 
   test("handles webp thumbnail conversion", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_webp_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video")
 
-    const origFetch = globalThis.fetch
-    globalThis.fetch = (async () => ({
-      ok: true,
-      headers: new Headers({ "content-type": "image/webp" }),
-      arrayBuffer: async () => new ArrayBuffer(50),
-    })) as any
-
-    let spawnCalls: string[][] = []
-    Bun.spawn = ((args: string[], opts?: any) => {
-      spawnCalls.push(args)
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string") {
-        // Create the output file
-        if (outFile.endsWith(".jpg") || outFile.includes(".tapir-meta-")) {
-          writeFileSync(outFile, "converted/tagged")
-        }
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockThumbnailFetch("image/webp")
+
+    const spawnCalls = mockFfmpeg()
 
     const result = await embedMetadata(
       tmpFile,
@@ -244,32 +178,16 @@ describe("embedMetadata with mocked ffmpeg", () => {
     // Should have called ffmpeg for webp->jpg conversion and for metadata embedding
     expect(spawnCalls.length).toBeGreaterThanOrEqual(1)
 
-    globalThis.fetch = origFetch
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 
   test("handles thumbnail download failure", async () => {
     const tmpFile = join(tmpdir(), `tapir_emb_nothumb_${Date.now()}.mp4`)
     writeFileSync(tmpFile, "fake video")
 
-    const origFetch = globalThis.fetch
-    globalThis.fetch = (async () => ({
-      ok: false,
-      headers: new Headers(),
-      arrayBuffer: async () => new ArrayBuffer(0),
-    })) as any
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      const outFile = args[args.length - 1]
-      if (typeof outFile === "string" && outFile.includes(".tapir-meta-")) {
-        writeFileSync(outFile, "output")
-      }
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockThumbnailFetch(null)
+
+    mockFfmpeg()
 
     const result = await embedMetadata(
       tmpFile,
@@ -281,8 +199,7 @@ describe("embedMetadata with mocked ffmpeg", () => {
     expect(result.success).toBe(true)
     expect(result.message).not.toContain("thumbnail")
 
-    globalThis.fetch = origFetch
-    try { rmSync(tmpFile, { force: true }) } catch {}
+    rmSync(tmpFile, { force: true })
   })
 })
 
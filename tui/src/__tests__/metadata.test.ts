@@ -2,7 +2,7 @@
  * Tests for services/metadata.ts - metadata extraction and embedding
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { existsSync, writeFileSync, rmSync } from "fs"
+import { mkdirSync, writeFileSync, rmSync, utimesSync } from "fs"
 import { join } from "path"
 import { tmpdir } from "os"
 
@@ -11,7 +11,6 @@ import {
   embedMetadata,
   findLatestFile,
   embedMetadataInDir,
-  type MediaMetadata,
 } from "../services/metadata"
 import type { VideoInfo } from "../types"
 
@@ -157,11 +156,13 @@ describe("findLatestFile", () => {
     rmSync(testDir, { recursive: true, force: true })
   })
 
-  test("finds the most recently modified file", async () => {
+  test("finds the most recently modified file", () => {
     writeFileSync(join(testDir, "old.mp4"), "old")
-    // Ensure different timestamps
-    await Bun.sleep(50)
     writeFileSync(join(testDir, "new.mp4"), "new")
+    // Backdate instead of sleeping so the ordering never depends on timer
+    // or filesystem mtime resolution
+    const past = new Date(Date.now() - 60_000)
+    utimesSync(join(testDir, "old.mp4"), past, past)
 
     const result = findLatestFile(testDir)
     expect(result).not.toBeNull()
@@ -256,7 +257,3 @@ describe("embedMetadataInDir", () => {
     expect(results.length).toBe(1)
   })
 })
-
-function mkdirSync(path: string, opts?: any) {
-  require("fs").mkdirSync(path, opts)
-}
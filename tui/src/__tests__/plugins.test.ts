@@ -4,7 +4,7 @@
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
 import { existsSync, mkdirSync, writeFileSync, rmSync, chmodSync } from "fs"
 import { join } from "path"
-import { tmpdir, homedir } from "os"
+import { tmpdir } from "os"
 
 import {
   ensurePluginDirs,
@@ -14,7 +14,6 @@ import {
   runHook,
   getPluginSummary,
   type PluginHook,
-  type PluginContext,
 } from "../services/plugins"
 
 // ============================================================================
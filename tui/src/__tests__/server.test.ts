@@ -3,21 +3,33 @@
  *
  * Starts a test server on a random high port and sends real HTTP requests.
  */
-import { describe, test, expect, beforeAll, afterAll, beforeEach, afterEach } from "bun:test"
+import { describe, test, expect, beforeAll, afterAll, beforeEach } from "bun:test"
+import { writeFileSync, rmSync } from "fs"
+
+import { submitToServer } from "../services/client"
+import { clearVideoInfoCache } from "../services/downloader"
+import { mockSpawn } from "./helpers/spawn"
 
 // We'll test the handler directly by importing the server module
 // and calling fetch against a live Bun.serve instance.
 
 let server: ReturnType<typeof Bun.serve> | null = null
 let baseUrl: string = ""
+let maxConcurrentDownloads = 0
 let originalSpawn: typeof Bun.spawn
+const origLog = console.log
 
 beforeAll(async () => {
   originalSpawn = Bun.spawn
 
+  // Silence the startup banner and per-request access log for the whole file;
+  // restored in afterAll
+  console.log = () => {}
+
   // Import server module to get the request handler
   // Start the server on a random port
-  const { startServer } = await import("../server")
+  const { startServer, MAX_CONCURRENT_DOWNLOADS } = await import("../server")
+  maxConcurrentDownloads = MAX_CONCURRENT_DOWNLOADS
 
   // We need to capture the server. startServer prints and calls Bun.serve.
   // Instead, let's import the module and create our own test server.
@@ -29,10 +41,6 @@ beforeAll(async () => {
   const originalServe = Bun.serve
   let capturedServer: any = null
 
-  // Monkey-patch console.log to suppress server startup message
-  const origLog = console.log
-  console.log = () => {}
-
   Bun.serve = ((opts: any) => {
     capturedServer = originalServe({ ...opts, port: 0 })
     return capturedServer
@@ -41,7 +49,6 @@ beforeAll(async () => {
   startServer(0)
 
   Bun.serve = originalServe
-  console.log = origLog
 
   if (capturedServer) {
     server = capturedServer
@@ -49,11 +56,18 @@ beforeAll(async () => {
   }
 })
 
+// Other suites in the same bun process share the video-info cache; start each
+// test from an empty one so mocked yt-dlp replies are not shadowed
+beforeEach(() => {
+  clearVideoInfoCache()
+})
+
 afterAll(() => {
   if (server) {
     (server as any).stop?.()
   }
   Bun.spawn = originalSpawn
+  console.log = origLog
 })
 
 // ============================================================================
@@ -122,24 +136,15 @@ describe("POST /api/search", () => {
 
   test("accepts valid search request", async () => {
     // Mock Bun.spawn for yt-dlp search
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(
-            JSON.stringify({
-              id: "test123",
-              title: "Test Result",
-              channel: "TestChannel",
-              duration: 60,
-              view_count: 100,
-            }) + "\n",
-          ))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({
+      stdout: JSON.stringify({
+        id: "test123",
+        title: "Test Result",
+        channel: "TestChannel",
+        duration: 60,
+        view_count: 100,
+      }) + "\n",
+    })
 
     const res = await fetch(`${baseUrl}/api/search`, {
       method: "POST",
@@ -171,11 +176,7 @@ describe("POST /api/info", () => {
   })
 
   test("returns 404 when video info fetch fails", async () => {
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ exitCode: 1 })
 
     const res = await fetch(`${baseUrl}/api/info`, {
       method: "POST",
@@ -187,18 +188,7 @@ describe("POST /api/info", () => {
   })
 
   test("returns info for valid video", async () => {
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode(
-            JSON.stringify({ title: "Test Video", channel: "Ch", duration: 120 }) + "\n",
-          ))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: JSON.stringify({ title: "Test Video", channel: "Ch", duration: 120 }) + "\n" })
 
     const res = await fetch(`${baseUrl}/api/info`, {
       method: "POST",
@@ -229,16 +219,7 @@ describe("POST /api/download", () => {
   })
 
   test("queues a download and returns job ID", async () => {
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("[download] 100% of 10.00MiB in 00:02\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "[download] 100% of 10.00MiB in 00:02\n" })
 
     const res = await fetch(`${baseUrl}/api/download`, {
       method: "POST",
@@ -282,7 +263,7 @@ describe("POST /api/convert", () => {
 
   test("queues a conversion for a valid file", async () => {
     const tmp = "/tmp/tapir_test_convert.mp3"
-    require("fs").writeFileSync(tmp, "fake-audio-data")
+    writeFileSync(tmp, "fake-audio-data")
     try {
       const res = await fetch(`${baseUrl}/api/convert`, {
         method: "POST",
@@ -293,7 +274,7 @@ describe("POST /api/convert", () => {
       const data = await res.json() as any
       expect(data.jobId).toBeTruthy()
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 })
@@ -337,11 +318,7 @@ describe("GET /api/jobs/:id", () => {
 
   test("returns job details for existing job", async () => {
     // First create a job
-    Bun.spawn = ((args: string[]) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn()
 
     const createRes = await fetch(`${baseUrl}/api/download`, {
       method: "POST",
@@ -370,6 +347,42 @@ describe("DELETE /api/jobs/:id", () => {
     const res = await fetch(`${baseUrl}/api/jobs/nonexistent`, { method: "DELETE" })
     expect(res.status).toBe(404)
   })
+
+  test("deleting a job still waiting for a download slot keeps it from running", async () => {
+    // Hold every spawned process open until released so the slots stay busy
+    let release!: () => void
+    const gate = new Promise<void>((resolve) => { release = resolve })
+    const previousSpawn = Bun.spawn
+    const spawned = mockSpawn({ until: gate })
+
+    try {
+      const jobIds: string[] = []
+      for (let i = 0; i <= maxConcurrentDownloads; i++) {
+        const res = await fetch(`${baseUrl}/api/download`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ url: `https://youtube.com/watch?v=slot${i}` }),
+        })
+        jobIds.push(((await res.json()) as any).jobId)
+      }
+      const extraUrl = `https://youtube.com/watch?v=slot${maxConcurrentDownloads}`
+      const extraId = jobIds[jobIds.length - 1]
+
+      const extra = await (await fetch(`${baseUrl}/api/jobs/${extraId}`)).json() as any
+      expect(extra.status).toBe("queued")
+      expect(spawned.length).toBeLessThanOrEqual(maxConcurrentDownloads)
+
+      const del = await fetch(`${baseUrl}/api/jobs/${extraId}`, { method: "DELETE" })
+      expect(del.status).toBe(200)
+
+      release()
+      await Bun.sleep(100)
+      expect(spawned.some((args) => args.includes(extraUrl))).toBe(false)
+    } finally {
+      release()
+      Bun.spawn = previousSpawn
+    }
+  })
 })
 
 // ============================================================================
@@ -446,37 +459,21 @@ describe("Request body edge cases", () => {
 // ============================================================================
 
 describe("Security: URL scheme validation", () => {
-  test("rejects file:// URLs on /api/download", async () => {
-    const res = await fetch(`${baseUrl}/api/download`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ url: "file:///etc/passwd" }),
-    })
-    expect(res.status).toBe(400)
-    const data = await res.json() as any
-    expect(data.error).toContain("scheme")
-  })
-
-  test("rejects file:// URLs on /api/info", async () => {
-    const res = await fetch(`${baseUrl}/api/info`, {
+  test.each([
+    ["/api/download", "file:///etc/passwd"],
+    ["/api/info", "file:///etc/shadow"],
+    ["/api/download", "data:text/html,<h1>test</h1>"],
+  ])("%s rejects %s", async (endpoint, url) => {
+    const res = await fetch(`${baseUrl}${endpoint}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ url: "file:///etc/shadow" }),
+      body: JSON.stringify({ url }),
     })
     expect(res.status).toBe(400)
     const data = await res.json() as any
     expect(data.error).toContain("scheme")
   })
 
-  test("rejects data: URLs on /api/download", async () => {
-    const res = await fetch(`${baseUrl}/api/download`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ url: "data:text/html,<h1>test</h1>" }),
-    })
-    expect(res.status).toBe(400)
-  })
-
   test("allows https URLs on /api/download", async () => {
     const res = await fetch(`${baseUrl}/api/download`, {
       method: "POST",
@@ -489,22 +486,14 @@ describe("Security: URL scheme validation", () => {
 })
 
 describe("Security: path traversal", () => {
-  test("rejects /etc/ paths on /api/convert", async () => {
-    const res = await fetch(`${baseUrl}/api/convert`, {
+  test.each([
+    ["/api/convert", { inputFile: "/etc/passwd", outputFormat: "wav" }],
+    ["/api/tts", { inputFile: "/proc/self/environ" }],
+  ])("%s rejects system paths", async (endpoint, body) => {
+    const res = await fetch(`${baseUrl}${endpoint}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ inputFile: "/etc/passwd", outputFormat: "wav" }),
-    })
-    expect(res.status).toBe(400)
-    const data = await res.json() as any
-    expect(data.error).toContain("file path")
-  })
-
-  test("rejects /proc/ paths on /api/tts", async () => {
-    const res = await fetch(`${baseUrl}/api/tts`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ inputFile: "/proc/self/environ" }),
+      body: JSON.stringify(body),
     })
     expect(res.status).toBe(400)
     const data = await res.json() as any
@@ -515,7 +504,7 @@ describe("Security: path traversal", () => {
 describe("Security: SSRF protection", () => {
   test("rejects private network thumbnailUrl on /api/metadata/embed", async () => {
     const tmp = "/tmp/tapir_test_ssrf.mp4"
-    require("fs").writeFileSync(tmp, "fake-video-data")
+    writeFileSync(tmp, "fake-video-data")
     try {
       const res = await fetch(`${baseUrl}/api/metadata/embed`, {
         method: "POST",
@@ -526,13 +515,13 @@ describe("Security: SSRF protection", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Thumbnail URL")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 
   test("rejects localhost thumbnailUrl on /api/metadata/embed", async () => {
     const tmp = "/tmp/tapir_test_ssrf2.mp4"
-    require("fs").writeFileSync(tmp, "fake-video-data")
+    writeFileSync(tmp, "fake-video-data")
     try {
       const res = await fetch(`${baseUrl}/api/metadata/embed`, {
         method: "POST",
@@ -543,7 +532,7 @@ describe("Security: SSRF protection", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Thumbnail URL")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 })
@@ -576,7 +565,7 @@ describe("Security headers", () => {
 describe("Enum validation", () => {
   test("rejects invalid audio format on /api/convert", async () => {
     const tmp = "/tmp/tapir_test_enum.mp3"
-    require("fs").writeFileSync(tmp, "fake-audio-data")
+    writeFileSync(tmp, "fake-audio-data")
     try {
       const res = await fetch(`${baseUrl}/api/convert`, {
         method: "POST",
@@ -587,13 +576,13 @@ describe("Enum validation", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Unsupported output format")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 
   test("rejects invalid TTS engine on /api/tts", async () => {
     const tmp = "/tmp/tapir_test_tts_enum.txt"
-    require("fs").writeFileSync(tmp, "test text")
+    writeFileSync(tmp, "test text")
     try {
       const res = await fetch(`${baseUrl}/api/tts`, {
         method: "POST",
@@ -604,13 +593,13 @@ describe("Enum validation", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Unsupported TTS engine")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 
   test("rejects invalid TTS output format on /api/tts", async () => {
     const tmp = "/tmp/tapir_test_tts_fmt.txt"
-    require("fs").writeFileSync(tmp, "test text")
+    writeFileSync(tmp, "test text")
     try {
       const res = await fetch(`${baseUrl}/api/tts`, {
         method: "POST",
@@ -621,7 +610,7 @@ describe("Enum validation", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Unsupported TTS output format")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 })
@@ -644,7 +633,7 @@ describe("Output directory validation", () => {
 
   test("rejects system paths as outputDir on /api/tts", async () => {
     const tmp = "/tmp/tapir_test_outdir.txt"
-    require("fs").writeFileSync(tmp, "test text")
+    writeFileSync(tmp, "test text")
     try {
       const res = await fetch(`${baseUrl}/api/tts`, {
         method: "POST",
@@ -655,7 +644,53 @@ describe("Output directory validation", () => {
       const data = await res.json() as any
       expect(data.error).toContain("Output directory not allowed")
     } finally {
-      try { require("fs").unlinkSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
+    }
+  })
+})
+
+// ============================================================================
+// --submit client
+// ============================================================================
+
+describe("submitToServer", () => {
+  test("queues a download and prints the returned job id", async () => {
+    mockSpawn()
+    const printed: string[] = []
+    console.log = (line: string) => { printed.push(line) }
+
+    try {
+      const code = await submitToServer(["https://youtube.com/watch?v=submit"], (server as any).port)
+      expect(code).toBe(0)
+      // The server's access log shares console.log with the client output
+      const queued = printed.filter((line) => line.startsWith("job_"))
+      expect(queued).toHaveLength(1)
+      const [jobId, url] = queued[0].split(/\s+/)
+      expect(url).toBe("https://youtube.com/watch?v=submit")
+
+      const res = await fetch(`${baseUrl}/api/jobs/${jobId}`)
+      expect(res.status).toBe(200)
+      expect(((await res.json()) as any).type).toBe("download")
+    } finally {
+      console.log = () => {}
+    }
+  })
+
+  test("reports the HTTP status for a non-JSON error body and keeps going", async () => {
+    const proxy = Bun.serve({ port: 0, fetch: () => new Response("Bad Gateway", { status: 502 }) })
+    const errors: string[] = []
+    const origError = console.error
+    console.error = (line: string) => { errors.push(line) }
+
+    try {
+      const code = await submitToServer(["https://a.example/1", "https://a.example/2"], proxy.port)
+      expect(code).toBe(1)
+      expect(errors).toHaveLength(2)
+      expect(errors[0]).toContain("HTTP 502")
+      expect(errors[0]).not.toContain("Could not reach")
+    } finally {
+      console.error = origError
+      proxy.stop()
     }
   })
 })
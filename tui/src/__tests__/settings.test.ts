@@ -2,7 +2,7 @@
  * Tests for services/settings.ts
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { existsSync, unlinkSync, mkdirSync, readFileSync } from "fs"
+import { existsSync, unlinkSync, mkdirSync, readFileSync, writeFileSync } from "fs"
 import { homedir } from "os"
 import { join } from "path"
 
@@ -34,7 +34,6 @@ beforeEach(() => {
 afterEach(() => {
   // Restore original settings file
   if (hadExistingFile && existingContent !== null) {
-    const { writeFileSync } = require("fs")
     writeFileSync(SETTINGS_FILE, existingContent, "utf-8")
   } else if (!hadExistingFile && existsSync(SETTINGS_FILE)) {
     unlinkSync(SETTINGS_FILE)
@@ -106,7 +105,6 @@ describe("saveSettings and loadSettings", () => {
   })
 
   test("loadSettings merges with defaults for partial files", () => {
-    const { writeFileSync } = require("fs")
     mkdirSync(SETTINGS_DIR, { recursive: true })
     writeFileSync(SETTINGS_FILE, JSON.stringify({ outputDir: "custom_dir" }), "utf-8")
     const loaded = loadSettings()
@@ -116,7 +114,6 @@ describe("saveSettings and loadSettings", () => {
   })
 
   test("loadSettings returns defaults for malformed JSON", () => {
-    const { writeFileSync } = require("fs")
     mkdirSync(SETTINGS_DIR, { recursive: true })
     writeFileSync(SETTINGS_FILE, "not json", "utf-8")
     const loaded = loadSettings()
@@ -11,6 +11,7 @@ import {
   cleanupTapirConfig,
   type OSType,
 } from "../services/setup"
+import { mockSpawn } from "./helpers/spawn"
 
 let originalSpawn: typeof Bun.spawn
 
@@ -34,32 +35,14 @@ describe("installDependency", () => {
   })
 
   test("returns failure for unsupported OS", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("command not found"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(127),
-    })) as any
+    mockSpawn({ stderr: "command not found", exitCode: 127 })
 
     const result = await installDependency("yt-dlp", "unsupported" as any)
     expect(result.success).toBe(false)
   })
 
   test("returns success when install command succeeds", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("Successfully installed"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "Successfully installed" })
 
     const result = await installDependency("yt-dlp", "ubuntu")
     expect(result.success).toBe(true)
@@ -67,32 +50,10 @@ describe("installDependency", () => {
   })
 
   test("tries next command when first fails", async () => {
-    let callCount = 0
-    Bun.spawn = ((args: string[], opts?: any) => {
-      callCount++
-      if (callCount === 1) {
-        return {
-          stdout: new ReadableStream({ start(c) { c.close() } }),
-          stderr: new ReadableStream({
-            start(c) {
-              c.enqueue(new TextEncoder().encode("command not found"))
-              c.close()
-            },
-          }),
-          exited: Promise.resolve(1),
-        }
-      }
-      return {
-        stdout: new ReadableStream({
-          start(c) {
-            c.enqueue(new TextEncoder().encode("installed via pip"))
-            c.close()
-          },
-        }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockSpawn([
+      { stderr: "command not found", exitCode: 1 },
+      { stdout: "installed via pip" },
+    ])
 
     // yt-dlp on macOS has two commands: brew and pip3
     const result = await installDependency("yt-dlp", "macos")
@@ -100,16 +61,7 @@ describe("installDependency", () => {
   })
 
   test("returns failure when all install commands fail", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("install failed"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "install failed", exitCode: 1 })
 
     const result = await installDependency("yt-dlp", "ubuntu")
     expect(result.success).toBe(false)
@@ -117,23 +69,14 @@ describe("installDependency", () => {
   })
 
   test("handles spawn exception", async () => {
-    Bun.spawn = (() => { throw new Error("spawn error") }) as any
+    mockSpawn(() => { throw new Error("spawn error") })
 
     const result = await installDependency("yt-dlp", "ubuntu")
     expect(result.success).toBe(false)
   })
 
   test("installs python3 on different OSes", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const osTypes: OSType[] = ["ubuntu", "debian", "fedora", "arch", "alpine", "macos", "windows_wsl"]
 
@@ -144,16 +87,7 @@ describe("installDependency", () => {
   })
 
   test("installs ffmpeg on different OSes", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const osTypes: OSType[] = ["ubuntu", "fedora", "arch", "opensuse", "alpine"]
     for (const os of osTypes) {
@@ -163,32 +97,14 @@ describe("installDependency", () => {
   })
 
   test("installs whisper", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const result = await installDependency("whisper", "ubuntu")
     expect(result.success).toBe(true)
   })
 
   test("installs pip", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const result = await installDependency("pip", "macos")
     expect(result.success).toBe(true)
@@ -207,16 +123,7 @@ describe("uninstallDependency", () => {
   })
 
   test("returns success when uninstall command succeeds", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("Successfully uninstalled"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "Successfully uninstalled" })
 
     const result = await uninstallDependency("yt-dlp", "ubuntu")
     expect(result.success).toBe(true)
@@ -224,16 +131,7 @@ describe("uninstallDependency", () => {
   })
 
   test("returns failure when uninstall command fails", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("permission denied"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "permission denied", exitCode: 1 })
 
     const result = await uninstallDependency("whisper", "ubuntu")
     expect(result.success).toBe(false)
@@ -241,23 +139,14 @@ describe("uninstallDependency", () => {
   })
 
   test("handles spawn exception", async () => {
-    Bun.spawn = (() => { throw new Error("spawn error") }) as any
+    mockSpawn(() => { throw new Error("spawn error") })
 
     const result = await uninstallDependency("ffmpeg", "ubuntu")
     expect(result.success).toBe(false)
   })
 
   test("uninstalls ffmpeg on different OSes", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const osTypes: OSType[] = ["ubuntu", "fedora", "arch", "opensuse", "alpine", "macos", "windows_wsl"]
     for (const os of osTypes) {
@@ -267,16 +156,7 @@ describe("uninstallDependency", () => {
   })
 
   test("uninstalls whisper on different OSes", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("ok"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "ok" })
 
     const osTypes: OSType[] = ["ubuntu", "macos", "arch"]
     for (const os of osTypes) {
@@ -317,11 +197,18 @@ describe("cleanupTapirConfig", () => {
 // ============================================================================
 
 describe("getDependencies checkFn", () => {
-  test("each dependency checkFn returns a boolean", async () => {
-    const deps = getDependencies()
-    for (const dep of deps) {
-      const result = await dep.checkFn()
-      expect(typeof result).toBe("boolean")
+  // Stubbed so the checks never launch the real python/yt-dlp/ffmpeg probes
+  test("each dependency checkFn reports a successful probe as installed", async () => {
+    mockSpawn({ exitCode: 0 })
+    for (const dep of getDependencies()) {
+      expect(await dep.checkFn()).toBe(true)
+    }
+  })
+
+  test("each dependency checkFn reports a failed probe as missing", async () => {
+    mockSpawn({ exitCode: 1 })
+    for (const dep of getDependencies()) {
+      expect(await dep.checkFn()).toBe(false)
     }
   })
 
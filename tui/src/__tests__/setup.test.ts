@@ -2,9 +2,9 @@
  * Tests for services/setup.ts - OS detection, config persistence, dependencies
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { existsSync, writeFileSync, readFileSync, rmSync, mkdirSync } from "fs"
+import { existsSync, writeFileSync, readFileSync, rmSync } from "fs"
 import { join } from "path"
-import { tmpdir, homedir } from "os"
+import { homedir } from "os"
 
 import {
   detectOS,
@@ -126,7 +126,7 @@ describe("Config persistence", () => {
 
   test("loadConfig returns null when no config exists", () => {
     // Temporarily remove config
-    try { rmSync(CONFIG_FILE) } catch {}
+    rmSync(CONFIG_FILE, { force: true })
 
     const result = loadConfig()
     expect(result).toBeNull()
@@ -145,7 +145,7 @@ describe("Config persistence", () => {
   })
 
   test("isFirstRun returns true when config is missing", () => {
-    try { rmSync(CONFIG_FILE) } catch {}
+    rmSync(CONFIG_FILE, { force: true })
     expect(isFirstRun()).toBe(true)
   })
 })
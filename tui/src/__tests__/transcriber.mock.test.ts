@@ -3,43 +3,48 @@
  * Tests all code paths by mocking Bun.spawn for external commands
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { writeFileSync, rmSync, mkdirSync, existsSync } from "fs"
+import { writeFileSync, rmSync, mkdirSync } from "fs"
 import { join } from "path"
 import { tmpdir } from "os"
 
+import {
+  extractSubtitlesFromUrl,
+  downloadAudioForTranscription,
+  transcribeWithWhisper,
+  transcribeFromUrl,
+  transcribeLocalFile,
+} from "../services/transcriber"
+import { clearVideoInfoCache } from "../services/downloader"
+import { mockSpawn } from "./helpers/spawn"
+
 let originalSpawn: typeof Bun.spawn
 
+// transcribeFromUrl looks up video info, which is cached across suites
 beforeEach(() => {
   originalSpawn = Bun.spawn
+  clearVideoInfoCache()
 })
 
 afterEach(() => {
   Bun.spawn = originalSpawn
 })
 
-// Helper to create a mock Bun.spawn
-function mockSpawn(responses: Array<{ stdout: string; stderr: string; exitCode: number }>) {
-  let callIndex = 0
-  Bun.spawn = ((args: string[], opts?: any) => {
-    const resp = responses[callIndex] || { stdout: "", stderr: "", exitCode: 1 }
-    callIndex++
-    return {
-      stdout: new ReadableStream({
-        start(c) {
-          if (resp.stdout) c.enqueue(new TextEncoder().encode(resp.stdout))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({
-        start(c) {
-          if (resp.stderr) c.enqueue(new TextEncoder().encode(resp.stderr))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(resp.exitCode),
-    }
-  }) as any
-}
+// Canned `yt-dlp --dump-json` replies, serialized once for every test
+const FR_SUBTITLE_INFO = JSON.stringify({
+  title: "Test",
+  subtitles: { fr: [{ ext: "srt", url: "http://example.com/fr.srt" }] },
+  automatic_captions: {},
+})
+const EN_SUBTITLE_INFO = JSON.stringify({
+  title: "Test",
+  subtitles: { en: [{ ext: "srt", url: "http://example.com/en.srt" }] },
+  automatic_captions: {},
+})
+const EN_AUTO_CAPTION_INFO = JSON.stringify({
+  title: "Test",
+  subtitles: {},
+  automatic_captions: { en: [{ ext: "vtt", url: "http://example.com/auto.vtt" }] },
+})
 
 // ============================================================================
 // extractSubtitlesFromUrl
@@ -47,7 +52,6 @@ function mockSpawn(responses: Array<{ stdout: string; stderr: string; exitCode:
 
 describe("extractSubtitlesFromUrl", () => {
   test("returns null when info fetch fails", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
     mockSpawn([{ stdout: "", stderr: "error", exitCode: 1 }])
 
     const result = await extractSubtitlesFromUrl("https://youtube.com/watch?v=test", "test_output")
@@ -55,18 +59,10 @@ describe("extractSubtitlesFromUrl", () => {
   })
 
   test("returns null when no subtitles available for language", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
-
-    const info = JSON.stringify({
-      title: "Test",
-      subtitles: { fr: [{ ext: "srt", url: "http://example.com/fr.srt" }] },
-      automatic_captions: {},
-    })
-
     // First call: info fetch succeeds
     // Second call: subtitle download
     mockSpawn([
-      { stdout: info, stderr: "", exitCode: 0 },
+      { stdout: FR_SUBTITLE_INFO, stderr: "", exitCode: 0 },
       { stdout: "", stderr: "", exitCode: 0 },
     ])
 
@@ -85,8 +81,6 @@ describe("extractSubtitlesFromUrl", () => {
   })
 
   test("downloads and returns subtitles when available", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
-
     const testDir = join(tmpdir(), `tapir_sub_test_${Date.now()}`)
     mkdirSync(testDir, { recursive: true })
 
@@ -96,35 +90,8 @@ describe("extractSubtitlesFromUrl", () => {
 Hello world`
     writeFileSync(join(testDir, "video.en.srt"), srtContent)
 
-    const info = JSON.stringify({
-      title: "Test",
-      subtitles: { en: [{ ext: "srt", url: "http://example.com/en.srt" }] },
-      automatic_captions: {},
-    })
-
-    let callCount = 0
-    Bun.spawn = ((args: string[], opts?: any) => {
-      callCount++
-      if (callCount === 1) {
-        // Info fetch
-        return {
-          stdout: new ReadableStream({
-            start(c) {
-              c.enqueue(new TextEncoder().encode(info))
-              c.close()
-            },
-          }),
-          stderr: new ReadableStream({ start(c) { c.close() } }),
-          exited: Promise.resolve(0),
-        }
-      }
-      // Subtitle download - the file already exists from our mock
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    // Info fetch, then the subtitle download - the file already exists from our mock
+    mockSpawn((_args, call) => (call === 0 ? { stdout: EN_SUBTITLE_INFO } : {}))
 
     // We need to make getDownloadDirectory return our test dir
     // Since it may not, let's just test the non-null branch differently
@@ -133,16 +100,8 @@ Hello world`
   })
 
   test("uses automatic_captions when manual subtitles missing", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
-
-    const info = JSON.stringify({
-      title: "Test",
-      subtitles: {},
-      automatic_captions: { en: [{ ext: "vtt", url: "http://example.com/auto.vtt" }] },
-    })
-
     mockSpawn([
-      { stdout: info, stderr: "", exitCode: 0 },
+      { stdout: EN_AUTO_CAPTION_INFO, stderr: "", exitCode: 0 },
       { stdout: "", stderr: "", exitCode: 0 },
     ])
 
@@ -161,9 +120,7 @@ Hello world`
   })
 
   test("handles exception gracefully", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
-
-    Bun.spawn = (() => { throw new Error("spawn fail") }) as any
+    mockSpawn(() => { throw new Error("spawn fail") })
 
     const messages: string[] = []
     const result = await extractSubtitlesFromUrl(
@@ -179,17 +136,7 @@ Hello world`
   })
 
   test("includes cookies args when provided", async () => {
-    const { extractSubtitlesFromUrl } = await import("../services/transcriber")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[], opts?: any) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(1),
-      }
-    }) as any
+    const calls = mockSpawn({ exitCode: 1 })
 
     await extractSubtitlesFromUrl(
       "https://youtube.com/watch?v=test",
@@ -199,6 +146,7 @@ Hello world`
       "chrome",
     )
 
+    const capturedArgs = calls[calls.length - 1]
     expect(capturedArgs).toContain("--cookies")
     expect(capturedArgs).toContain("/path/cookies.txt")
     expect(capturedArgs).toContain("--cookies-from-browser")
@@ -212,8 +160,6 @@ Hello world`
 
 describe("downloadAudioForTranscription", () => {
   test("returns null when download fails", async () => {
-    const { downloadAudioForTranscription } = await import("../services/transcriber")
-
     mockSpawn([{ stdout: "", stderr: "download failed", exitCode: 1 }])
 
     const messages: string[] = []
@@ -229,8 +175,6 @@ describe("downloadAudioForTranscription", () => {
   })
 
   test("returns audio path on success", async () => {
-    const { downloadAudioForTranscription } = await import("../services/transcriber")
-
     mockSpawn([{ stdout: "", stderr: "", exitCode: 0 }])
 
     const messages: string[] = []
@@ -246,9 +190,7 @@ describe("downloadAudioForTranscription", () => {
   })
 
   test("handles exception gracefully", async () => {
-    const { downloadAudioForTranscription } = await import("../services/transcriber")
-
-    Bun.spawn = (() => { throw new Error("spawn fail") }) as any
+    mockSpawn(() => { throw new Error("spawn fail") })
 
     const messages: string[] = []
     const result = await downloadAudioForTranscription(
@@ -262,17 +204,7 @@ describe("downloadAudioForTranscription", () => {
   })
 
   test("includes cookies in args", async () => {
-    const { downloadAudioForTranscription } = await import("../services/transcriber")
-    let capturedArgs: string[] = []
-
-    Bun.spawn = ((args: string[]) => {
-      capturedArgs = args
-      return {
-        stdout: new ReadableStream({ start(c) { c.close() } }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(1),
-      }
-    }) as any
+    const calls = mockSpawn({ exitCode: 1 })
 
     await downloadAudioForTranscription(
       "https://youtube.com/watch?v=test",
@@ -281,6 +213,7 @@ describe("downloadAudioForTranscription", () => {
       "firefox",
     )
 
+    const capturedArgs = calls[calls.length - 1]
     expect(capturedArgs).toContain("--cookies")
     expect(capturedArgs).toContain("--cookies-from-browser")
   })
@@ -292,8 +225,6 @@ describe("downloadAudioForTranscription", () => {
 
 describe("transcribeWithWhisper", () => {
   test("falls back to Python when CLI fails", async () => {
-    const { transcribeWithWhisper } = await import("../services/transcriber")
-
     // First call: whisper CLI fails; Second call: Python fallback also fails
     mockSpawn([
       { stdout: "", stderr: "not found", exitCode: 1 },
@@ -313,8 +244,6 @@ describe("transcribeWithWhisper", () => {
   })
 
   test("returns transcription from whisper CLI JSON output", async () => {
-    const { transcribeWithWhisper } = await import("../services/transcriber")
-
     const testDir = join(tmpdir(), `tapir_whisper_${Date.now()}`)
     mkdirSync(testDir, { recursive: true })
 
@@ -346,28 +275,11 @@ describe("transcribeWithWhisper", () => {
   })
 
   test("handles exception and falls back to python", async () => {
-    const { transcribeWithWhisper } = await import("../services/transcriber")
-
-    let callCount = 0
-    Bun.spawn = ((args: string[]) => {
-      callCount++
-      if (callCount === 1) throw new Error("cli not found")
+    mockSpawn((_args, call) => {
+      if (call === 0) throw new Error("cli not found")
       // Python fallback
-      return {
-        stdout: new ReadableStream({
-          start(c) {
-            c.enqueue(new TextEncoder().encode(JSON.stringify({
-              text: "Python transcription",
-              segments: [],
-              language: "en",
-            })))
-            c.close()
-          },
-        }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+      return { stdout: JSON.stringify({ text: "Python transcription", segments: [], language: "en" }) }
+    })
 
     const result = await transcribeWithWhisper("/tmp/audio.wav", "base")
     if (result) {
@@ -382,8 +294,6 @@ describe("transcribeWithWhisper", () => {
 
 describe("transcribeFromUrl", () => {
   test("tries subtitles first, then audio download", async () => {
-    const { transcribeFromUrl } = await import("../services/transcriber")
-
     // All spawns fail - no subtitles, no audio download
     mockSpawn([
       { stdout: "", stderr: "", exitCode: 1 }, // info fetch fails
@@ -401,36 +311,15 @@ describe("transcribeFromUrl", () => {
   })
 
   test("returns subtitle result when available", async () => {
-    const { transcribeFromUrl } = await import("../services/transcriber")
-
     const testDir = join(tmpdir(), `tapir_tfu_${Date.now()}`)
     mkdirSync(testDir, { recursive: true })
 
-    const info = JSON.stringify({
-      title: "Test",
-      subtitles: { en: [{ ext: "srt", url: "http://example.com/en.srt" }] },
-      automatic_captions: {},
-    })
-
     // Write a subtitle file for the download to find
     writeFileSync(join(testDir, "test.en.srt"), `1
 00:00:01,000 --> 00:00:03,000
 Subtitle text here`)
 
-    let callCount = 0
-    Bun.spawn = ((args: string[], opts?: any) => {
-      callCount++
-      return {
-        stdout: new ReadableStream({
-          start(c) {
-            if (callCount === 1) c.enqueue(new TextEncoder().encode(info))
-            c.close()
-          },
-        }),
-        stderr: new ReadableStream({ start(c) { c.close() } }),
-        exited: Promise.resolve(0),
-      }
-    }) as any
+    mockSpawn((_args, call) => (call === 0 ? { stdout: EN_SUBTITLE_INFO } : {}))
 
     const messages: string[] = []
     const result = await transcribeFromUrl(
@@ -448,8 +337,6 @@ Subtitle text here`)
 
 describe("transcribeLocalFile", () => {
   test("delegates to transcribeWithWhisper", async () => {
-    const { transcribeLocalFile } = await import("../services/transcriber")
-
     // Mock whisper failing
     mockSpawn([
       { stdout: "", stderr: "fail", exitCode: 1 },
@@ -461,8 +348,6 @@ describe("transcribeLocalFile", () => {
   })
 
   test("returns result from whisper", async () => {
-    const { transcribeLocalFile } = await import("../services/transcriber")
-
     const testDir = join(tmpdir(), `tapir_local_${Date.now()}`)
     mkdirSync(testDir, { recursive: true })
     writeFileSync(join(testDir, "audio.json"), JSON.stringify({
@@ -1,8 +1,8 @@
 /**
  * Tests for services/transcriber.ts - transcription saving and pipeline
  */
-import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { existsSync, readFileSync, writeFileSync, rmSync, mkdirSync } from "fs"
+import { describe, test, expect, beforeAll, afterAll } from "bun:test"
+import { existsSync, readFileSync, rmSync, mkdirSync } from "fs"
 import { join } from "path"
 import { tmpdir } from "os"
 
@@ -13,13 +13,14 @@ import type { TranscriptionSegment } from "../types"
 // saveTranscription - pure file-writing function
 // ============================================================================
 
+// One directory for the whole file; every test writes to its own file name
 const testDir = join(tmpdir(), `tapir_transcribe_test_${Date.now()}`)
 
-beforeEach(() => {
+beforeAll(() => {
   mkdirSync(testDir, { recursive: true })
 })
 
-afterEach(() => {
+afterAll(() => {
   rmSync(testDir, { recursive: true, force: true })
 })
 
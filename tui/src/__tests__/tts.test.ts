@@ -1,8 +1,8 @@
 /**
  * Tests for services/tts.ts - text-to-speech, document parsing, chunking, voices
  */
-import { describe, test, expect, beforeEach, afterEach } from "bun:test"
-import { writeFileSync, rmSync, mkdirSync, existsSync } from "fs"
+import { describe, test, expect } from "bun:test"
+import { writeFileSync, rmSync } from "fs"
 import { join } from "path"
 import { tmpdir } from "os"
 
@@ -26,6 +26,10 @@ import {
   SUPPORTED_DOCUMENT_EXTENSIONS,
 } from "../utils"
 
+// Engine probes and synthesis shell out to python and TTS binaries;
+// `bun run test:quick` skips them.
+const QUICK = !!process.env.TAPIR_QUICK_TESTS
+
 // ============================================================================
 // isSupportedDocumentFile
 // ============================================================================
@@ -35,66 +39,20 @@ describe("isSupportedDocumentFile", () => {
     expect(isSupportedDocumentFile("/nonexistent/file.pdf")).toBe(false)
   })
 
-  test("returns true for .txt file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.txt`)
-    writeFileSync(tmpFile, "Hello world")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .pdf file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.pdf`)
-    writeFileSync(tmpFile, "fake pdf")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .md file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.md`)
-    writeFileSync(tmpFile, "# Hello")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .html file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.html`)
-    writeFileSync(tmpFile, "<html><body>Hello</body></html>")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .csv file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.csv`)
-    writeFileSync(tmpFile, "a,b,c")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .rst file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.rst`)
-    writeFileSync(tmpFile, "Title\n=====")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns true for .log file", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.log`)
-    writeFileSync(tmpFile, "2024-01-01 INFO message")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(true)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns false for unsupported extension like .mp3", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.mp3`)
-    writeFileSync(tmpFile, "fake audio")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(false)
-    rmSync(tmpFile, { force: true })
-  })
-
-  test("returns false for .jpg image", () => {
-    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}.jpg`)
-    writeFileSync(tmpFile, "fake image")
-    expect(isSupportedDocumentFile(tmpFile)).toBe(false)
+  test.each([
+    [".txt", true],
+    [".pdf", true],
+    [".md", true],
+    [".html", true],
+    [".csv", true],
+    [".rst", true],
+    [".log", true],
+    [".mp3", false],
+    [".jpg", false],
+  ])("existing %s file -> %s", (ext, expected) => {
+    const tmpFile = join(tmpdir(), `tapir_tts_${Date.now()}${ext}`)
+    writeFileSync(tmpFile, "content")
+    expect(isSupportedDocumentFile(tmpFile)).toBe(expected)
     rmSync(tmpFile, { force: true })
   })
 })
@@ -347,7 +305,7 @@ describe("getDefaultVoice", () => {
 // listVoices
 // ============================================================================
 
-describe("listVoices", () => {
+describe.skipIf(QUICK)("listVoices", () => {
   test("returns voices for edge-tts (falls back to defaults if not installed)", async () => {
     const voices = await listVoices("edge-tts")
     expect(voices.length).toBeGreaterThan(0)
@@ -370,7 +328,7 @@ describe("listVoices", () => {
 // TTS Engine Detection (utils)
 // ============================================================================
 
-describe("TTS engine detection", () => {
+describe.skipIf(QUICK)("TTS engine detection", () => {
   test("checkEdgeTts returns boolean", async () => {
     const result = await checkEdgeTts()
     expect(typeof result).toBe("boolean")
@@ -396,7 +354,7 @@ describe("TTS engine detection", () => {
 // textToSpeech (integration-level)
 // ============================================================================
 
-describe("textToSpeech", () => {
+describe.skipIf(QUICK)("textToSpeech", () => {
   test("returns failure for non-existent input file", async () => {
     const result = await textToSpeech({
       inputFile: "/nonexistent/file.txt",
@@ -420,12 +378,7 @@ describe("textToSpeech", () => {
     const tmpFile = join(tmpdir(), `tapir_tts_noeng_${Date.now()}.txt`)
     writeFileSync(tmpFile, "Hello world test")
 
-    // Mock detectAvailableTtsEngine to return null
-    const origDetect = (await import("../utils")).detectAvailableTtsEngine
-    const utils = await import("../utils")
-    const origFn = utils.detectAvailableTtsEngine
-
-    // We can't easily mock module functions, so test with a valid file
+    // Module functions can't be swapped out, so test with a valid file
     // and let it use whatever engine is available or fail gracefully
     const result = await textToSpeech({ inputFile: tmpFile })
     expect(typeof result.success).toBe("boolean")
@@ -10,6 +10,7 @@ import {
   updateYtDlp,
   compareVersions,
 } from "../services/updater"
+import { mockSpawn } from "./helpers/spawn"
 
 let originalSpawn: typeof Bun.spawn
 let originalFetch: typeof globalThis.fetch
@@ -58,27 +59,14 @@ describe("compareVersions", () => {
 
 describe("getYtDlpVersion", () => {
   test("returns version string on success", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("2025.01.15\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "2025.01.15\n" })
 
     const version = await getYtDlpVersion()
     expect(version).toBe("2025.01.15")
   })
 
   test("returns null on failure", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ exitCode: 1 })
 
     const version = await getYtDlpVersion()
     expect(version).toBeNull()
@@ -125,16 +113,7 @@ describe("getLatestYtDlpVersion", () => {
 
 describe("checkForUpdates", () => {
   test("detects update available", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("2025.01.01\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "2025.01.01\n" })
 
     globalThis.fetch = (async () => ({
       ok: true,
@@ -148,16 +127,7 @@ describe("checkForUpdates", () => {
   })
 
   test("detects no update needed", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("2025.02.01\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "2025.02.01\n" })
 
     globalThis.fetch = (async () => ({
       ok: true,
@@ -182,16 +152,7 @@ describe("checkForUpdates", () => {
   })
 
   test("handles GitHub API failure", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("2025.01.01\n"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "2025.01.01\n" })
 
     globalThis.fetch = (async () => ({ ok: false })) as any
 
@@ -208,16 +169,7 @@ describe("checkForUpdates", () => {
 
 describe("updateYtDlp", () => {
   test("returns success on exit code 0", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("Successfully installed yt-dlp"))
-          c.close()
-        },
-      }),
-      stderr: new ReadableStream({ start(c) { c.close() } }),
-      exited: Promise.resolve(0),
-    })) as any
+    mockSpawn({ stdout: "Successfully installed yt-dlp" })
 
     const result = await updateYtDlp()
     expect(result.success).toBe(true)
@@ -225,16 +177,7 @@ describe("updateYtDlp", () => {
   })
 
   test("returns failure on non-zero exit", async () => {
-    Bun.spawn = ((args: string[], opts?: any) => ({
-      stdout: new ReadableStream({ start(c) { c.close() } }),
-      stderr: new ReadableStream({
-        start(c) {
-          c.enqueue(new TextEncoder().encode("Permission denied"))
-          c.close()
-        },
-      }),
-      exited: Promise.resolve(1),
-    })) as any
+    mockSpawn({ stderr: "Permission denied", exitCode: 1 })
 
     const result = await updateYtDlp()
     expect(result.success).toBe(false)
@@ -2,6 +2,22 @@
  * Additional tests for utils.ts - dependency check functions and edge cases
  */
 import { describe, test, expect, beforeEach, afterEach } from "bun:test"
+import { existsSync, mkdtempSync, rmSync } from "fs"
+import { join } from "path"
+import { tmpdir } from "os"
+
+import {
+  checkYtDlp,
+  checkFfmpeg,
+  checkWhisper,
+  clearDependencyCache,
+  memoizeCheck,
+  getDownloadDirectory,
+} from "../utils"
+
+// Probing the real toolchain (python imports, external binaries) is the slow
+// part of the suite; `bun run test:quick` skips those checks.
+const QUICK = !!process.env.TAPIR_QUICK_TESTS
 
 let originalSpawn: typeof Bun.spawn
 
@@ -18,18 +34,13 @@ afterEach(() => {
 // ============================================================================
 
 describe("checkYtDlp", () => {
-  test("returns true when yt-dlp is available", async () => {
-    const { checkYtDlp } = await import("../utils")
+  test.skipIf(QUICK)("returns true when yt-dlp is available", async () => {
     const result = await checkYtDlp()
     // In test env it might or might not be installed
     expect(typeof result).toBe("boolean")
   })
 
-  test("returns false when command fails", async () => {
-    const { checkYtDlp } = await import("../utils")
-
-    // Save and mock $
-    const orig$ = (await import("bun")).$
+  test.skipIf(QUICK)("returns false when command fails", async () => {
     Bun.spawn = (() => { throw new Error("not found") }) as any
 
     // checkYtDlp uses $ which is different from Bun.spawn
@@ -44,20 +55,42 @@ describe("checkYtDlp", () => {
 // ============================================================================
 
 describe("checkFfmpeg", () => {
-  test("returns a boolean", async () => {
-    const { checkFfmpeg } = await import("../utils")
+  test.skipIf(QUICK)("returns a boolean", async () => {
     const result = await checkFfmpeg()
     expect(typeof result).toBe("boolean")
   })
 })
 
+// ============================================================================
+// memoizeCheck
+// ============================================================================
+
+describe("memoizeCheck", () => {
+  test("runs the probe once until the dependency cache is cleared", async () => {
+    clearDependencyCache()
+    let probes = 0
+    const probe = async () => {
+      probes++
+      return true
+    }
+
+    const first = memoizeCheck("test-tool", probe)
+    expect(memoizeCheck("test-tool", probe)).toBe(first)
+    expect(await first).toBe(true)
+    expect(probes).toBe(1)
+
+    clearDependencyCache()
+    await memoizeCheck("test-tool", probe)
+    expect(probes).toBe(2)
+  })
+})
+
 // ============================================================================
 // checkWhisper
 // ============================================================================
 
-describe("checkWhisper", () => {
+describe.skipIf(QUICK)("checkWhisper", () => {
   test("returns a boolean", async () => {
-    const { checkWhisper } = await import("../utils")
     const result = await checkWhisper()
     expect(typeof result).toBe("boolean")
   })
@@ -69,14 +102,53 @@ describe("checkWhisper", () => {
 
 describe("getDownloadDirectory edge cases", () => {
   test("handles relative path", () => {
-    const { getDownloadDirectory } = require("../utils")
-    const dir = getDownloadDirectory("test_relative_dir")
-    expect(typeof dir).toBe("string")
-    expect(dir.length).toBeGreaterThan(0)
+    // Relative names resolve under the home directory; point HOME at a
+    // scratch dir so the test never touches the real one.
+    const home = mkdtempSync(join(tmpdir(), "tapir-home-"))
+    const originalHome = process.env.HOME
+    process.env.HOME = home
+    try {
+      const dir = getDownloadDirectory(`tapir_relative_${process.pid}`)
+      expect(dir).toBe(join(home, `tapir_relative_${process.pid}`))
+      expect(existsSync(dir)).toBe(true)
+    } finally {
+      if (originalHome === undefined) delete process.env.HOME
+      else process.env.HOME = originalHome
+      rmSync(home, { recursive: true, force: true })
+    }
+  })
+
+  test("follows HOME changes between calls with the same name", () => {
+    const homeA = mkdtempSync(join(tmpdir(), "tapir-home-"))
+    const homeB = mkdtempSync(join(tmpdir(), "tapir-home-"))
+    const name = `tapir_rehome_${process.pid}`
+    const originalHome = process.env.HOME
+    try {
+      process.env.HOME = homeA
+      expect(getDownloadDirectory(name)).toBe(join(homeA, name))
+      process.env.HOME = homeB
+      expect(getDownloadDirectory(name)).toBe(join(homeB, name))
+    } finally {
+      if (originalHome === undefined) delete process.env.HOME
+      else process.env.HOME = originalHome
+      rmSync(homeA, { recursive: true, force: true })
+      rmSync(homeB, { recursive: true, force: true })
+    }
+  })
+
+  test("recreates a cached directory that was removed", () => {
+    const dir = join(tmpdir(), `tapir_removed_${process.pid}`)
+    try {
+      expect(getDownloadDirectory(dir)).toBe(dir)
+      rmSync(dir, { recursive: true, force: true })
+      expect(getDownloadDirectory(dir)).toBe(dir)
+      expect(existsSync(dir)).toBe(true)
+    } finally {
+      rmSync(dir, { recursive: true, force: true })
+    }
   })
 
   test("uses default directory name", () => {
-    const { getDownloadDirectory } = require("../utils")
     const dir = getDownloadDirectory()
     expect(dir).toContain("youtube_downloads")
   })
@@ -1,10 +1,10 @@
 /**
  * Tests for utils.ts - formatting, validation, site detection, and helpers
  */
-import { describe, test, expect, beforeEach, afterEach, mock, spyOn } from "bun:test"
-import { existsSync, mkdirSync, accessSync, writeFileSync, rmSync } from "fs"
+import { describe, test, expect, beforeAll, afterAll } from "bun:test"
+import { existsSync, writeFileSync, rmSync, symlinkSync } from "fs"
 import { join } from "path"
-import { tmpdir } from "os"
+import { homedir, tmpdir } from "os"
 
 import {
   VERSION,
@@ -29,9 +29,12 @@ import {
   getSupportedAudioFormats,
   getWhisperModels,
   parseSubtitleToText,
+  parseUrlList,
+  readUrlsFromFile,
   validateFilePath,
   isSafeUrl,
   isSafeFetchUrl,
+  createLimiter,
 } from "../utils"
 
 // ============================================================================
@@ -75,36 +78,22 @@ describe("Constants", () => {
 // ============================================================================
 
 describe("formatDuration", () => {
-  test("returns 'Unknown' for undefined", () => {
-    expect(formatDuration(undefined)).toBe("Unknown")
-  })
-
-  test("returns 'Unknown' for 0", () => {
-    expect(formatDuration(0)).toBe("Unknown")
-  })
-
-  test("formats seconds only", () => {
-    expect(formatDuration(45)).toBe("00:45")
-  })
-
-  test("formats minutes and seconds", () => {
-    expect(formatDuration(125)).toBe("02:05")
-  })
-
-  test("formats hours, minutes, seconds", () => {
-    expect(formatDuration(3661)).toBe("1:01:01")
-  })
-
-  test("formats exactly one hour", () => {
-    expect(formatDuration(3600)).toBe("1:00:00")
-  })
-
-  test("pads minutes and seconds", () => {
-    expect(formatDuration(7262)).toBe("2:01:02")
-  })
-
-  test("handles large durations", () => {
-    expect(formatDuration(36000)).toBe("10:00:00")
+  test.each([
+    [undefined, "Unknown"],
+    [0, "Unknown"],
+    [45, "00:45"],
+    [125, "02:05"],
+    [3600, "1:00:00"],
+    [3661, "1:01:01"],
+    [7262, "2:01:02"],
+    [36000, "10:00:00"],
+  ])("formats %s as %s", (seconds, expected) => {
+    expect(formatDuration(seconds)).toBe(expected)
+  })
+
+  test("drops fractional seconds", () => {
+    expect(formatDuration(59.9)).toBe("00:59")
+    expect(formatDuration(3599.5)).toBe("59:59")
   })
 })
 
@@ -113,37 +102,26 @@ describe("formatDuration", () => {
 // ============================================================================
 
 describe("formatSize", () => {
-  test("returns '0B' for undefined", () => {
-    expect(formatSize(undefined)).toBe("0B")
-  })
-
-  test("returns '0B' for 0", () => {
-    expect(formatSize(0)).toBe("0B")
-  })
-
-  test("formats bytes", () => {
-    expect(formatSize(500)).toBe("500.00 B")
-  })
-
-  test("formats kilobytes", () => {
-    expect(formatSize(1024)).toBe("1.00 KB")
-  })
-
-  test("formats megabytes", () => {
-    expect(formatSize(1048576)).toBe("1.00 MB")
+  test.each([
+    [undefined, "0B"],
+    [0, "0B"],
+    [500, "500.00 B"],
+    [1024, "1.00 KB"],
+    [1536, "1.50 KB"],
+    [1048576, "1.00 MB"],
+    [1073741824, "1.00 GB"],
+    [1099511627776, "1.00 TB"],
+  ])("formats %s as %s", (bytes, expected) => {
+    expect(formatSize(bytes)).toBe(expected)
   })
 
-  test("formats gigabytes", () => {
-    expect(formatSize(1073741824)).toBe("1.00 GB")
+  test("stays in the lower unit just below a boundary", () => {
+    expect(formatSize(1023)).toBe("1023.00 B")
+    expect(formatSize(1048575)).toBe("1024.00 KB")
   })
 
-  test("formats terabytes", () => {
-    expect(formatSize(1099511627776)).toBe("1.00 TB")
-  })
-
-  test("formats fractional values", () => {
-    const result = formatSize(1536)
-    expect(result).toBe("1.50 KB")
+  test("caps at terabytes", () => {
+    expect(formatSize(1024 ** 5)).toBe("1024.00 TB")
   })
 })
 
@@ -152,16 +130,12 @@ describe("formatSize", () => {
 // ============================================================================
 
 describe("formatCount", () => {
-  test("returns 'Unknown' for undefined", () => {
-    expect(formatCount(undefined)).toBe("Unknown")
-  })
-
-  test("returns 'Unknown' for 0", () => {
-    expect(formatCount(0)).toBe("Unknown")
-  })
-
-  test("formats small number", () => {
-    expect(formatCount(42)).toBe("42")
+  test.each([
+    [undefined, "Unknown"],
+    [0, "Unknown"],
+    [42, "42"],
+  ])("formats %s as %s", (count, expected) => {
+    expect(formatCount(count)).toBe(expected)
   })
 
   test("formats with locale separators", () => {
@@ -170,6 +144,10 @@ describe("formatCount", () => {
     expect(result).toContain("1")
     expect(result.length).toBeGreaterThan(5)
   })
+
+  test("matches toLocaleString output", () => {
+    expect(formatCount(9876543)).toBe((9876543).toLocaleString())
+  })
 })
 
 // ============================================================================
@@ -177,20 +155,13 @@ describe("formatCount", () => {
 // ============================================================================
 
 describe("formatTimestampSrt", () => {
-  test("formats zero", () => {
-    expect(formatTimestampSrt(0)).toBe("00:00:00,000")
-  })
-
-  test("formats seconds with milliseconds", () => {
-    expect(formatTimestampSrt(5.5)).toBe("00:00:05,500")
-  })
-
-  test("formats minutes", () => {
-    expect(formatTimestampSrt(125.25)).toBe("00:02:05,250")
-  })
-
-  test("formats hours", () => {
-    expect(formatTimestampSrt(3661.123)).toBe("01:01:01,123")
+  test.each([
+    [0, "00:00:00,000"],
+    [5.5, "00:00:05,500"],
+    [125.25, "00:02:05,250"],
+    [3661.123, "01:01:01,123"],
+  ])("formats %s as %s", (seconds, expected) => {
+    expect(formatTimestampSrt(seconds)).toBe(expected)
   })
 })
 
@@ -199,20 +170,19 @@ describe("formatTimestampSrt", () => {
 // ============================================================================
 
 describe("formatTimestampVtt", () => {
-  test("formats zero", () => {
-    expect(formatTimestampVtt(0)).toBe("00:00:00.000")
+  test.each([
+    [0, "00:00:00.000"],
+    [5.5, "00:00:05.500"],
+    [3661.123, "01:01:01.123"],
+  ])("formats %s as %s", (seconds, expected) => {
+    expect(formatTimestampVtt(seconds)).toBe(expected)
   })
 
   test("uses dot separator instead of comma", () => {
     const result = formatTimestampVtt(5.5)
-    expect(result).toBe("00:00:05.500")
     expect(result).toContain(".")
     expect(result).not.toContain(",")
   })
-
-  test("formats hours", () => {
-    expect(formatTimestampVtt(3661.123)).toBe("01:01:01.123")
-  })
 })
 
 // ============================================================================
@@ -220,37 +190,18 @@ describe("formatTimestampVtt", () => {
 // ============================================================================
 
 describe("isValidUrl", () => {
-  test("returns false for empty string", () => {
-    expect(isValidUrl("")).toBe(false)
-  })
-
-  test("returns false for null/undefined-like", () => {
-    expect(isValidUrl(null as any)).toBe(false)
-    expect(isValidUrl(undefined as any)).toBe(false)
-  })
-
-  test("returns false for non-string", () => {
-    expect(isValidUrl(123 as any)).toBe(false)
-  })
-
-  test("returns true for http URL", () => {
-    expect(isValidUrl("http://example.com")).toBe(true)
-  })
-
-  test("returns true for https URL", () => {
-    expect(isValidUrl("https://youtube.com/watch?v=abc")).toBe(true)
-  })
-
-  test("returns true for www URL", () => {
-    expect(isValidUrl("www.example.com")).toBe(true)
-  })
-
-  test("returns true for domain with dot", () => {
-    expect(isValidUrl("example.com")).toBe(true)
-  })
-
-  test("returns false for plain word without dot", () => {
-    expect(isValidUrl("notaurl")).toBe(false)
+  test.each([
+    ["", false],
+    [null, false],
+    [undefined, false],
+    [123, false],
+    ["http://example.com", true],
+    ["https://youtube.com/watch?v=abc", true],
+    ["www.example.com", true],
+    ["example.com", true],
+    ["notaurl", false],
+  ])("%s -> %s", (url, expected) => {
+    expect(isValidUrl(url as any)).toBe(expected)
   })
 })
 
@@ -259,36 +210,22 @@ describe("isValidUrl", () => {
 // ============================================================================
 
 describe("isValidYoutubeUrl", () => {
-  test("matches standard watch URL", () => {
-    expect(isValidYoutubeUrl("https://www.youtube.com/watch?v=dQw4w9WgXcQ")).toBe(true)
-  })
-
-  test("matches short URL", () => {
-    expect(isValidYoutubeUrl("https://youtu.be/dQw4w9WgXcQ")).toBe(true)
-  })
-
-  test("matches shorts URL", () => {
-    expect(isValidYoutubeUrl("https://www.youtube.com/shorts/dQw4w9WgXcQ")).toBe(true)
-  })
-
-  test("matches playlist URL", () => {
-    expect(isValidYoutubeUrl("https://www.youtube.com/playlist?list=PLtest123")).toBe(true)
-  })
-
-  test("matches channel URL", () => {
-    expect(isValidYoutubeUrl("https://www.youtube.com/@username")).toBe(true)
-  })
-
-  test("rejects non-YouTube URL", () => {
-    expect(isValidYoutubeUrl("https://vimeo.com/123456")).toBe(false)
-  })
-
-  test("rejects empty string", () => {
-    expect(isValidYoutubeUrl("")).toBe(false)
-  })
-
-  test("matches without protocol", () => {
-    expect(isValidYoutubeUrl("youtube.com/watch?v=dQw4w9WgXcQ")).toBe(true)
+  test.each([
+    ["https://www.youtube.com/watch?v=dQw4w9WgXcQ", true],
+    ["https://youtu.be/dQw4w9WgXcQ", true],
+    ["https://www.youtube.com/shorts/dQw4w9WgXcQ", true],
+    ["https://www.youtube.com/playlist?list=PLtest123", true],
+    ["https://www.youtube.com/@username", true],
+    ["youtube.com/watch?v=dQw4w9WgXcQ", true],
+    ["https://www.youtube.com/watch?feature=share&list=PLtest123", true],
+    ["https://www.youtube.com/channel/UC123", true],
+    ["https://www.youtube.com/c/name", true],
+    ["https://www.youtube.com/user/name", true],
+    ["https://vimeo.com/123456", false],
+    ["", false],
+    ["https://youtu.be/short", false],
+  ])("%s -> %s", (url, expected) => {
+    expect(isValidYoutubeUrl(url)).toBe(expected)
   })
 })
 
@@ -297,56 +234,33 @@ describe("isValidYoutubeUrl", () => {
 // ============================================================================
 
 describe("detectSite", () => {
-  test("detects youtube.com", () => {
-    expect(detectSite("https://www.youtube.com/watch?v=abc")).toBe("youtube")
-  })
-
-  test("detects youtu.be", () => {
-    expect(detectSite("https://youtu.be/abc")).toBe("youtube")
-  })
-
-  test("detects vimeo", () => {
-    expect(detectSite("https://vimeo.com/123456")).toBe("vimeo")
-  })
-
-  test("detects soundcloud", () => {
-    expect(detectSite("https://soundcloud.com/artist/track")).toBe("soundcloud")
-  })
-
-  test("detects dailymotion", () => {
-    expect(detectSite("https://www.dailymotion.com/video/abc")).toBe("dailymotion")
-  })
-
-  test("detects twitch", () => {
-    expect(detectSite("https://www.twitch.tv/videos/123")).toBe("twitch")
-  })
-
-  test("detects bandcamp", () => {
-    expect(detectSite("https://artist.bandcamp.com/track/song")).toBe("bandcamp")
-  })
-
-  test("detects tiktok", () => {
-    expect(detectSite("https://www.tiktok.com/@user/video/123")).toBe("tiktok")
-  })
-
-  test("detects instagram", () => {
-    expect(detectSite("https://www.instagram.com/reel/abc")).toBe("instagram")
-  })
-
-  test("returns 'other' for unknown sites", () => {
-    expect(detectSite("https://example.com/video")).toBe("other")
-  })
-
-  test("handles URL without protocol", () => {
-    expect(detectSite("youtube.com/watch?v=abc")).toBe("youtube")
-  })
-
-  test("handles invalid URL gracefully", () => {
-    expect(detectSite("not a url at all")).toBe("other")
-  })
-
-  test("strips www prefix", () => {
-    expect(detectSite("https://www.vimeo.com/123")).toBe("vimeo")
+  test.each([
+    ["https://www.youtube.com/watch?v=abc", "youtube"],
+    ["https://youtu.be/abc", "youtube"],
+    ["https://vimeo.com/123456", "vimeo"],
+    ["https://soundcloud.com/artist/track", "soundcloud"],
+    ["https://www.dailymotion.com/video/abc", "dailymotion"],
+    ["https://www.twitch.tv/videos/123", "twitch"],
+    ["https://artist.bandcamp.com/track/song", "bandcamp"],
+    ["https://www.tiktok.com/@user/video/123", "tiktok"],
+    ["https://www.instagram.com/reel/abc", "instagram"],
+    ["https://example.com/video", "other"],
+    // No protocol, unparseable input, and a www prefix on a non-YouTube host
+    ["youtube.com/watch?v=abc", "youtube"],
+    ["not a url at all", "other"],
+    ["https://www.vimeo.com/123", "vimeo"],
+  ])("detects %s as %s", (url, expected) => {
+    expect(detectSite(url)).toBe(expected)
+  })
+
+  test("detects mobile and music subdomains", () => {
+    expect(detectSite("https://m.youtube.com/watch?v=abc")).toBe("youtube")
+    expect(detectSite("https://music.youtube.com/watch?v=abc")).toBe("youtube")
+  })
+
+  test("does not match lookalike hosts", () => {
+    expect(detectSite("https://youtube.com.example.org/watch")).toBe("other")
+    expect(detectSite("https://notyoutube.com/watch")).toBe("other")
   })
 })
 
@@ -363,13 +277,10 @@ describe("getSupportedSites", () => {
     expect(sites.other).toBeDefined()
   })
 
-  test("each site has name, description, example", () => {
-    const sites = getSupportedSites()
-    for (const key of Object.keys(sites)) {
-      expect(sites[key].name).toBeTruthy()
-      expect(sites[key].description).toBeTruthy()
-      expect(sites[key].example).toBeTruthy()
-    }
+  test.each(Object.entries(getSupportedSites()))("%s has name, description, example", (_key, site) => {
+    expect(site.name).toBeTruthy()
+    expect(site.description).toBeTruthy()
+    expect(site.example).toBeTruthy()
   })
 })
 
@@ -397,6 +308,15 @@ describe("getDownloadDirectory", () => {
     expect(dir).toBe(testDir)
     rmSync(dir, { recursive: true, force: true })
   })
+
+  test("recreates a cached directory that was removed", () => {
+    const testDir = join(tmpdir(), `tapir_cached_${Date.now()}`)
+    expect(getDownloadDirectory(testDir)).toBe(testDir)
+    rmSync(testDir, { recursive: true, force: true })
+    expect(getDownloadDirectory(testDir)).toBe(testDir)
+    expect(existsSync(testDir)).toBe(true)
+    rmSync(testDir, { recursive: true, force: true })
+  })
 })
 
 // ============================================================================
@@ -406,12 +326,12 @@ describe("getDownloadDirectory", () => {
 describe("isLocalMediaFile", () => {
   const tmpFile = join(tmpdir(), `tapir_test_${Date.now()}.mp4`)
 
-  beforeEach(() => {
+  beforeAll(() => {
     writeFileSync(tmpFile, "fake video data")
   })
 
-  afterEach(() => {
-    try { rmSync(tmpFile, { force: true }) } catch {}
+  afterAll(() => {
+    rmSync(tmpFile, { force: true })
   })
 
   test("returns true for existing media file", () => {
@@ -460,6 +380,13 @@ describe("sanitizeFilename", () => {
 // ============================================================================
 
 describe("getSupportedAudioFormats", () => {
+  test("returns a shared frozen table", () => {
+    const formats = getSupportedAudioFormats()
+    expect(getSupportedAudioFormats()).toBe(formats)
+    expect(Object.isFrozen(formats)).toBe(true)
+    expect(Object.isFrozen(formats.mp3)).toBe(true)
+  })
+
   test("returns expected formats", () => {
     const formats = getSupportedAudioFormats()
     expect(formats.mp3).toBeDefined()
@@ -470,14 +397,11 @@ describe("getSupportedAudioFormats", () => {
     expect(formats.m4a).toBeDefined()
   })
 
-  test("each format has required fields", () => {
-    const formats = getSupportedAudioFormats()
-    for (const key of Object.keys(formats)) {
-      expect(formats[key].name).toBeTruthy()
-      expect(formats[key].description).toBeTruthy()
-      expect(formats[key].defaultBitrate).toBeGreaterThan(0)
-      expect(formats[key].codec).toBeTruthy()
-    }
+  test.each(Object.entries(getSupportedAudioFormats()))("%s has required fields", (_key, format) => {
+    expect(format.name).toBeTruthy()
+    expect(format.description).toBeTruthy()
+    expect(format.defaultBitrate).toBeGreaterThan(0)
+    expect(format.codec).toBeTruthy()
   })
 })
 
@@ -504,6 +428,42 @@ describe("getWhisperModels", () => {
   })
 })
 
+// ============================================================================
+// parseUrlList / readUrlsFromFile
+// ============================================================================
+
+describe("parseUrlList", () => {
+  test("splits newline and space separated URLs", () => {
+    expect(parseUrlList("https://a.com/1\nhttps://b.com/2 https://c.com/3")).toEqual([
+      "https://a.com/1",
+      "https://b.com/2",
+      "https://c.com/3",
+    ])
+  })
+
+  test("skips blank lines and comments", () => {
+    const text = "# my list\n\n  https://a.com/1  \r\nhttps://b.com/2 # trailing note\n   # indented comment\n"
+    expect(parseUrlList(text)).toEqual(["https://a.com/1", "https://b.com/2"])
+  })
+
+  test("keeps URL fragments", () => {
+    expect(parseUrlList("https://a.com/v#t=30")).toEqual(["https://a.com/v#t=30"])
+  })
+
+  test("returns empty list for empty input", () => {
+    expect(parseUrlList("")).toEqual([])
+  })
+})
+
+describe("readUrlsFromFile", () => {
+  test("reads URLs from a file", () => {
+    const file = join(tmpdir(), `tapir_urls_${Date.now()}.txt`)
+    writeFileSync(file, "# header\nhttps://a.com/1\n\nhttps://b.com/2\n")
+    expect(readUrlsFromFile(file)).toEqual(["https://a.com/1", "https://b.com/2"])
+    rmSync(file, { force: true })
+  })
+})
+
 // ============================================================================
 // parseSubtitleToText
 // ============================================================================
@@ -621,7 +581,7 @@ describe("validateFilePath", () => {
       const result = validateFilePath(tmp)
       expect(result).toBe(tmp)
     } finally {
-      try { rmSync(tmp) } catch {}
+      rmSync(tmp, { force: true })
     }
   })
 
@@ -716,20 +676,20 @@ describe("validateFilePath symlink handling", () => {
   test("blocks symlinks pointing to /etc/", () => {
     const linkPath = join(tmpdir(), "tapir_symlink_test_" + Date.now())
     try {
-      require("fs").symlinkSync("/etc/passwd", linkPath)
+      symlinkSync("/etc/passwd", linkPath)
       expect(validateFilePath(linkPath)).toBeNull()
     } finally {
-      try { require("fs").unlinkSync(linkPath) } catch {}
+      rmSync(linkPath, { force: true })
     }
   })
 
   test("blocks symlinks pointing to /proc/", () => {
     const linkPath = join(tmpdir(), "tapir_symlink_test2_" + Date.now())
     try {
-      require("fs").symlinkSync("/proc/version", linkPath)
+      symlinkSync("/proc/version", linkPath)
       expect(validateFilePath(linkPath)).toBeNull()
     } finally {
-      try { require("fs").unlinkSync(linkPath) } catch {}
+      rmSync(linkPath, { force: true })
     }
   })
 })
@@ -742,7 +702,6 @@ import { validateOutputDir } from "../utils"
 
 describe("validateOutputDir", () => {
   test("allows directories under home", () => {
-    const { homedir } = require("os")
     expect(validateOutputDir(join(homedir(), "downloads"))).toBe(true)
     expect(validateOutputDir(join(homedir(), "youtube_downloads"))).toBe(true)
   })
@@ -798,3 +757,27 @@ describe("withSubprocessTimeout", () => {
     }
   })
 })
+
+describe("createLimiter", () => {
+  test("never runs more than the limit at once", async () => {
+    const limit = createLimiter(2)
+    let active = 0
+    let peak = 0
+    const task = async (n: number) => {
+      active++
+      peak = Math.max(peak, active)
+      await new Promise((r) => setTimeout(r, 5))
+      active--
+      return n
+    }
+    const results = await Promise.all([1, 2, 3, 4, 5].map((n) => limit(() => task(n))))
+    expect(results).toEqual([1, 2, 3, 4, 5])
+    expect(peak).toBe(2)
+  })
+
+  test("frees the slot when a task rejects", async () => {
+    const limit = createLimiter(1)
+    await expect(limit(() => Promise.reject(new Error("boom")))).rejects.toThrow("boom")
+    expect(await limit(async () => "next")).toBe("next")
+  })
+})
@@ -10,7 +10,7 @@
  *   - Browsing playlists and selecting individual videos
  *
  * Also supports:
- *   - REST API daemon mode (--server)
+ *   - REST API daemon mode (--server), with a thin client (--submit)
  *   - MCP server for AI agents (--mcp)
  *   - Plugin system (~/.config/tapir/plugins/)
  *   - Metadata embedding (automatic on download)
@@ -30,8 +30,9 @@ import { loadSettings } from "./services/settings"
 // ============================================================================
 
 interface ParsedArgs {
-  mode: AppScreen | "server" | "mcp"
+  mode: AppScreen | "server" | "mcp" | "submit"
   target?: string
+  targets?: string[]
   port?: number
   host?: string
 }
@@ -51,6 +52,8 @@ Usage:
   bun run src/index.ts --tts <FILE>       Convert a document to speech audio
   bun run src/index.ts --setup            Run dependency setup
   bun run src/index.ts --server [--port N] [--host ADDR] Start REST API server
+  bun run src/index.ts --submit <URL...> [--port N] [--host ADDR]
+                                          Queue downloads on a running server
   bun run src/index.ts --mcp              Start MCP server for AI agents (stdio)
   bun run src/index.ts --help             Show this help message
 
@@ -93,16 +96,30 @@ Dependencies:
     process.exit(0)
   }
 
+  const portIdx = args.indexOf("--port")
+  const port = portIdx !== -1 && args[portIdx + 1] ? parseInt(args[portIdx + 1]) : undefined
+  const hostIdx = args.indexOf("--host")
+  const host = hostIdx !== -1 && args[hostIdx + 1] ? args[hostIdx + 1] : undefined
+
   // Server mode
   if (args.includes("--server")) {
-    const portIdx = args.indexOf("--port")
-    const port = portIdx !== -1 && args[portIdx + 1] ? parseInt(args[portIdx + 1]) : undefined
-    const hostIdx = args.indexOf("--host")
-    const host = hostIdx !== -1 && args[hostIdx + 1] ? args[hostIdx + 1] : undefined
     const settings = loadSettings()
     return { mode: "server", port: port ?? settings.apiPort, host }
   }
 
+  // Client for a running server: every non-flag argument after --submit is a URL
+  const submitIdx = args.indexOf("--submit")
+  if (submitIdx !== -1) {
+    const targets: string[] = []
+    for (let i = submitIdx + 1; i < args.length && !args[i].startsWith("--"); i++) targets.push(args[i])
+    if (targets.length === 0) {
+      console.error("Usage: bun run src/index.ts --submit <URL...> [--port N] [--host ADDR]")
+      process.exit(1)
+    }
+    const settings = loadSettings()
+    return { mode: "submit", targets, port: port ?? settings.apiPort, host }
+  }
+
   // MCP mode
   if (args.includes("--mcp")) {
     return { mode: "mcp" }
@@ -140,7 +157,7 @@ Dependencies:
 // ============================================================================
 
 async function main() {
-  const { mode, target, port, host } = parseArgs()
+  const { mode, target, targets, port, host } = parseArgs()
 
   // Non-TUI modes: server and MCP
   if (mode === "server") {
@@ -149,6 +166,11 @@ async function main() {
     return
   }
 
+  if (mode === "submit") {
+    const { submitToServer } = await import("./services/client")
+    process.exit(await submitToServer(targets!, port!, host))
+  }
+
   if (mode === "mcp") {
     const { startMcpServer } = await import("./mcp")
     await startMcpServer()
@@ -170,7 +192,7 @@ async function main() {
   })
 
   // Run dependency checks in parallel while renderer initialises
-  const { checkYtDlp, checkFfmpeg, checkWhisper } = await import("./utils")
+  const { checkYtDlp, checkFfmpeg, checkWhisper, clearDependencyCache } = await import("./utils")
   const [ytDlpInstalled, ffmpegInstalled, whisperAvailable] = await Promise.all([
     checkYtDlp(),
     checkFfmpeg(),
@@ -386,6 +408,7 @@ async function main() {
           running = false
         } else {
           // Re-check deps after potential removals
+          clearDependencyCache()
           const [yt, ff, wh] = await Promise.all([
             checkYtDlp(),
             checkFfmpeg(),
@@ -23,7 +23,7 @@ import {
   getVideoInfo,
   downloadVideo,
   searchYouTube,
-  listFormats,
+  groupFormats,
 } from "./services/downloader"
 import { convertAudioFile } from "./services/converter"
 import { textToSpeech, listVoices } from "./services/tts"
@@ -221,7 +221,7 @@ async function executeTool(
           }
         }
 
-        const formatList = await listFormats(url)
+        const formatList = info.formats ? groupFormats(info.formats) : null
 
         return {
           content: [
@@ -25,8 +25,9 @@ import { downloadVideoWithProgress } from "../services/downloader"
 import { embedMetadata, extractMetadata, findLatestFile } from "../services/metadata"
 import { runHook } from "../services/plugins"
 import { loadSettings } from "../services/settings"
-import { isValidUrl, formatDuration } from "../utils"
+import { isValidUrl, formatDuration, parseUrlList, readUrlsFromFile } from "../utils"
 import type { DownloadProgress, DownloadResult, VideoInfo } from "../types"
+import { existsSync } from "fs"
 
 type Phase = "url_input" | "format_select" | "downloading" | "done"
 
@@ -187,22 +188,46 @@ function showUrlInput() {
   })
 
   urlInput.on(InputRenderableEvents.ENTER, () => {
-    const url = urlInput?.value?.trim()
-    if (url && isValidUrl(url)) {
-      // Check for duplicates
-      if (queue.some((q) => q.url === url)) {
-        setStatus("URL already in queue.", colors.textYellow)
-      } else {
-        queue.push({ url, status: "pending" })
-        updateQueueDisplay()
-        setStatus(`Added (${queue.length} in queue). Add more or select Start Download.`, colors.textGreen)
-      }
-      // Clear input for next URL
-      if (urlInput) {
-        urlInput.value = ""
+    const value = urlInput?.value?.trim()
+    if (!value) return
+
+    // Accept a single URL, a pasted list, or the path of a URL list file
+    let candidates: string[]
+    try {
+      candidates = !value.includes("://") && existsSync(value) ? readUrlsFromFile(value) : parseUrlList(value)
+    } catch {
+      setStatus(`Could not read URL file: ${value}`, colors.textRed)
+      return
+    }
+
+    const queued = new Set(queue.map((q) => q.url))
+    let added = 0
+    let duplicates = 0
+    for (const url of candidates) {
+      if (!isValidUrl(url)) continue
+      if (queued.has(url)) {
+        duplicates++
+        continue
       }
-    } else if (url) {
+      queued.add(url)
+      queue.push({ url, status: "pending" })
+      added++
+    }
+
+    if (added > 0) {
+      updateQueueDisplay()
+      const addedLabel = added === 1 ? "Added" : `Added ${added} URLs`
+      setStatus(`${addedLabel} (${queue.length} in queue). Add more or select Start Download.`, colors.textGreen)
+    } else if (duplicates > 0) {
+      setStatus("URL already in queue.", colors.textYellow)
+    } else {
       setStatus("Invalid URL. Must start with http:// or https://", colors.textRed)
+      return
+    }
+
+    // Clear input for next URL
+    if (urlInput) {
+      urlInput.value = ""
     }
   })
 
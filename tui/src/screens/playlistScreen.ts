@@ -22,7 +22,7 @@ import {
 } from "@opentui/core"
 import type { SelectOption } from "@opentui/core"
 import { colors, layout } from "../components/theme"
-import { getVideoInfo, downloadVideoWithProgress } from "../services/downloader"
+import { getVideoInfo, downloadVideoWithProgress, resolvePlaylistEntry } from "../services/downloader"
 import { embedMetadata, extractMetadata, findLatestFile } from "../services/metadata"
 import { runHook } from "../services/plugins"
 import { loadSettings } from "../services/settings"
@@ -52,7 +52,13 @@ let currentPhase: Phase = "url_input"
 let playlistUrl = ""
 let playlistInfo: VideoInfo | null = null
 let playlistEntries: VideoInfo[] = []
+let entryRows: { label: string; description: string }[] = []
 let selected: Set<number> = new Set()
+let page = 0
+
+// Large playlists are shown a page at a time, so each toggle rebuilds at most
+// PAGE_SIZE rows instead of the whole playlist
+const PAGE_SIZE = 50
 
 // ============================================================================
 // Helpers
@@ -189,6 +195,8 @@ async function fetchPlaylist(url: string) {
     // Single video - still show it
     playlistEntries = [info]
   }
+  entryRows = []
+  page = 0
 
   if (playlistEntries.length === 0) {
     setStatus("No videos found in this playlist.", colors.textRed)
@@ -206,6 +214,28 @@ async function fetchPlaylist(url: string) {
 // Phase: Video Selection (toggle multi-select)
 // ============================================================================
 
+/**
+ * Selection-independent text for a video row. Formatted the first time its
+ * page is shown and reused on every rebuild after that, so toggling a video
+ * only re-prefixes the checkbox mark.
+ */
+function getEntryRow(i: number): { label: string; description: string } {
+  let row = entryRows[i]
+  if (!row) {
+    const entry = playlistEntries[i]
+    const channel = playlistInfo?.channel || playlistInfo?.uploader || "Unknown"
+    const idx = String(i + 1).padStart(String(playlistEntries.length).length, " ")
+    const entryTitle = entry.title || "Unknown"
+    const shortTitle = entryTitle.length > 60 ? entryTitle.slice(0, 57) + "..." : entryTitle
+    row = {
+      label: ` ${idx}. ${shortTitle}`,
+      description: `${entry.channel || entry.uploader || channel} | ${formatDuration(entry.duration)} | ${formatCount(entry.view_count)} views`,
+    }
+    entryRows[i] = row
+  }
+  return row
+}
+
 function showVideoSelection() {
   if (!renderer || !contentBox) return
   currentPhase = "selection"
@@ -213,9 +243,14 @@ function showVideoSelection() {
   const title = playlistInfo?.title || "Playlist"
   const channel = playlistInfo?.channel || playlistInfo?.uploader || "Unknown"
   const total = playlistEntries.length
+  const pageCount = Math.max(1, Math.ceil(total / PAGE_SIZE))
+  page = Math.min(page, pageCount - 1)
+  const pageStart = page * PAGE_SIZE
+  const pageEnd = Math.min(pageStart + PAGE_SIZE, total)
+  const pageInfo = pageCount > 1 ? ` | Showing ${pageStart + 1}-${pageEnd} (page ${page + 1}/${pageCount})` : ""
 
   setStatus(
-    `${title}\nChannel: ${channel} | ${total} video${total !== 1 ? "s" : ""}\n\nToggle selection with ENTER. Choose an action to proceed.`,
+    `${title}\nChannel: ${channel} | ${total} video${total !== 1 ? "s" : ""}${pageInfo}\n\nToggle selection with ENTER. Choose an action to proceed.`,
     colors.textGreen,
   )
 
@@ -238,20 +273,20 @@ function showVideoSelection() {
     value: "__toggle_all__",
   })
 
-  // Video entries
-  for (let i = 0; i < playlistEntries.length; i++) {
-    const entry = playlistEntries[i]
-    const isSelected = selected.has(i)
-    const mark = isSelected ? "[x]" : "[ ]"
-    const dur = formatDuration(entry.duration)
-    const views = formatCount(entry.view_count)
-    const idx = String(i + 1).padStart(String(total).length, " ")
-    const entryTitle = entry.title || "Unknown"
-    const shortTitle = entryTitle.length > 60 ? entryTitle.slice(0, 57) + "..." : entryTitle
+  // Page navigation
+  if (page < pageCount - 1) {
+    options.push({ name: "Next Page >>", description: `Videos ${pageEnd + 1}-${Math.min(pageEnd + PAGE_SIZE, total)}`, value: "__next_page__" })
+  }
+  if (page > 0) {
+    options.push({ name: "<< Previous Page", description: `Videos ${pageStart - PAGE_SIZE + 1}-${pageStart}`, value: "__prev_page__" })
+  }
 
+  // Video entries (current page only)
+  for (let i = pageStart; i < pageEnd; i++) {
+    const row = getEntryRow(i)
     options.push({
-      name: `${mark} ${idx}. ${shortTitle}`,
-      description: `${entry.channel || entry.uploader || channel} | ${dur} | ${views} views`,
+      name: (selected.has(i) ? "[x]" : "[ ]") + row.label,
+      description: row.description,
       value: `__video_${i}__`,
     })
   }
@@ -307,6 +342,12 @@ function showVideoSelection() {
       return
     }
 
+    if (val === "__next_page__" || val === "__prev_page__") {
+      page += val === "__next_page__" ? 1 : -1
+      showVideoSelection()
+      return
+    }
+
     if (val === "__toggle_all__") {
       if (selected.size === playlistEntries.length) {
         selected.clear()
@@ -490,7 +531,7 @@ async function startPlaylistDownload(format: string) {
         const latestFile = findLatestFile(result.outputDir)
         if (latestFile) {
           try {
-            const meta = extractMetadata(entry, entryUrl)
+            const meta = extractMetadata(await resolvePlaylistEntry(entry, entryUrl), entryUrl)
             await embedMetadata(latestFile, meta, { embedThumbnail: true })
           } catch { /* non-critical */ }
         }
@@ -538,7 +579,9 @@ export function run(rendererInstance: CliRenderer): Promise<void> {
     playlistUrl = ""
     playlistInfo = null
     playlistEntries = []
+    entryRows = []
     selected = new Set()
+    page = 0
 
     headerBox = new BoxRenderable(renderer, {
       id: "pl-header-box",
@@ -625,5 +668,5 @@ export function destroy(rendererInstance: CliRenderer): void {
   progressText = null; progressBarText = null
   keyHandler = null; renderer = null; resolveScreen = null
   currentPhase = "url_input"; playlistUrl = ""; playlistInfo = null
-  playlistEntries = []; selected = new Set()
+  playlistEntries = []; entryRows = []; selected = new Set(); page = 0
 }
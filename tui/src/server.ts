@@ -12,7 +12,7 @@
  *   bun run src/index.ts --server --port 9000
  */
 
-import { VERSION, validateFilePath, isSafeUrl, isSafeFetchUrl, validateOutputDir } from "./utils"
+import { VERSION, DEFAULT_MAX_WORKERS, createLimiter, validateFilePath, isSafeUrl, isSafeFetchUrl, validateOutputDir } from "./utils"
 import {
   getVideoInfo,
   downloadVideo,
@@ -59,8 +59,12 @@ const API_KEY = process.env.TAPIR_API_KEY || ""
 const CORS_ORIGIN = process.env.TAPIR_CORS_ORIGIN || "*"
 const RATE_LIMIT = parseInt(process.env.TAPIR_RATE_LIMIT || "60")
 const RATE_WINDOW_MS = 60_000
+export const MAX_CONCURRENT_DOWNLOADS = parseInt(process.env.TAPIR_MAX_CONCURRENT_DOWNLOADS || String(DEFAULT_MAX_WORKERS))
 let shuttingDown = false
 
+// Bounds concurrent yt-dlp processes across all queued download jobs
+const runDownload = createLimiter(MAX_CONCURRENT_DOWNLOADS)
+
 // ============================================================================
 // Rate Limiting (per-IP sliding window)
 // ============================================================================
@@ -498,8 +502,12 @@ async function handleRequest(req: Request, server: any): Promise<Response> {
 
     jobs.set(job.id, job)
 
-    // Start processing in background
-    processDownloadJob(job).catch(() => {
+    // Start processing in background; the job stays "queued" until a download
+    // slot frees, and is skipped if it was deleted while waiting
+    runDownload(async () => {
+      if (!jobs.has(job.id) || job.status !== "queued") return
+      await processDownloadJob(job)
+    }).catch(() => {
       job.status = "failed"
       job.completedAt = Date.now()
     })
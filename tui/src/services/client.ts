@@ -0,0 +1,49 @@
+/**
+ * Thin client for a running Tapir REST API server (--submit).
+ *
+ * The server keeps its caches, dependency checks and worker slots warm, so
+ * repeated CLI use skips starting the TUI runtime for every URL.
+ */
+
+// ============================================================================
+// Submission
+// ============================================================================
+
+/**
+ * Queue downloads on an already running --server instance, printing one
+ * "jobId  url" line per queued URL. Returns the process exit code.
+ */
+export async function submitToServer(urls: string[], port: number, host: string = "127.0.0.1"): Promise<number> {
+  const headers: Record<string, string> = { "Content-Type": "application/json" }
+  if (process.env.TAPIR_API_KEY) headers.Authorization = `Bearer ${process.env.TAPIR_API_KEY}`
+
+  let failures = 0
+  for (const url of urls) {
+    let res: Response
+    try {
+      res = await fetch(`http://${host}:${port}/api/download`, {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ url }),
+      })
+    } catch (err) {
+      failures++
+      console.error(`Could not reach Tapir server at ${host}:${port}: ${err}`)
+      break
+    }
+
+    // Proxies and crashed handlers can answer with a non-JSON body
+    let data: { jobId?: string; error?: string } = {}
+    try {
+      data = JSON.parse(await res.text())
+    } catch { /* fall back to the HTTP status below */ }
+
+    if (res.ok && data.jobId) {
+      console.log(`${data.jobId}  ${url}`)
+    } else {
+      failures++
+      console.error(`Failed to queue ${url}: ${data.error || `HTTP ${res.status} ${res.statusText}`.trim()}`)
+    }
+  }
+  return failures === 0 ? 0 : 1
+}
@@ -3,7 +3,7 @@
  */
 
 import { $ } from "bun"
-import { existsSync, statSync } from "fs"
+import { existsSync, statSync, type Stats } from "fs"
 import { extname, basename, join, dirname } from "path"
 import type { AudioMetadata, ConversionOptions, AudioFormatInfo } from "../types"
 import { getSupportedAudioFormats, formatSize, SUBPROCESS_TIMEOUT, withSubprocessTimeout } from "../utils"
@@ -14,20 +14,48 @@ const SUPPORTED_INPUT_EXTENSIONS = [".mp3", ".m4a", ".wav", ".flac", ".ogg", ".a
 // Metadata Extraction
 // ============================================================================
 
+// ffprobe reads a single input per process, so a long-lived probe process
+// isn't an option. Instead results are memoized per (path, size, mtime) so
+// re-opening the same file skips the spawn, and only the fields AudioMetadata
+// uses are requested. Callers get their own copy of each cached result.
+const AUDIO_METADATA_CACHE_MAX = 128
+const audioMetadataCache = new Map<string, AudioMetadata>()
+
 /**
- * Extract audio metadata using ffprobe.
+ * Extract audio metadata using ffprobe. Callers that already stat'ed the file
+ * can pass the result to skip a second stat for the cache key.
  */
-export async function getAudioMetadata(filePath: string): Promise<AudioMetadata | null> {
+export async function getAudioMetadata(filePath: string, stats?: Stats): Promise<AudioMetadata | null> {
+  let cacheKey: string
+  try {
+    stats ??= statSync(filePath)
+    cacheKey = `${filePath}:${stats.size}:${stats.mtimeMs}`
+  } catch {
+    return null
+  }
+
+  const cached = audioMetadataCache.get(cacheKey)
+  if (cached) return structuredClone(cached)
+
   try {
     const proc = Bun.spawn(
-      ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", filePath],
+      [
+        "ffprobe", "-v", "quiet", "-print_format", "json",
+        "-show_entries", "format=size,duration,bit_rate:stream=codec_type,bit_rate",
+        filePath,
+      ],
       { stdout: "pipe", stderr: "pipe" },
     )
     const stdout = await new Response(proc.stdout).text()
     const exitCode = await withSubprocessTimeout(proc, SUBPROCESS_TIMEOUT)
 
     if (exitCode === 0) {
-      return JSON.parse(stdout) as AudioMetadata
+      const metadata = JSON.parse(stdout) as AudioMetadata
+      audioMetadataCache.set(cacheKey, structuredClone(metadata))
+      if (audioMetadataCache.size > AUDIO_METADATA_CACHE_MAX) {
+        audioMetadataCache.delete(audioMetadataCache.keys().next().value!)
+      }
+      return metadata
     }
     return null
   } catch {
@@ -44,7 +72,7 @@ export async function getFileInfo(
   const stats = statSync(filePath)
   const size = stats.size
 
-  const metadata = await getAudioMetadata(filePath)
+  const metadata = await getAudioMetadata(filePath, stats)
   let duration: number | null = null
   let bitrate: number | null = null
 
@@ -74,9 +102,8 @@ export async function getFileInfo(
  * Check if a file is a supported audio input format.
  */
 export function isSupportedAudioFile(filePath: string): boolean {
-  if (!existsSync(filePath)) return false
   const ext = extname(filePath).toLowerCase()
-  return SUPPORTED_INPUT_EXTENSIONS.includes(ext)
+  return SUPPORTED_INPUT_EXTENSIONS.includes(ext) && existsSync(filePath)
 }
 
 // ============================================================================
@@ -90,6 +117,17 @@ export function estimateOutputSize(durationSeconds: number, bitrateKbps: number)
   return Math.floor((bitrateKbps * 1000 * durationSeconds) / 8)
 }
 
+const LOSSY_CODEC_RE = /mp3|aac|vorbis|opus/
+const LOSSLESS_CODEC_RE = /flac|wav|alac|pcm/
+
+// Lossy quality tiers, highest bitrate floor first
+const LOSSY_TIERS: [number, string][] = [
+  [320, "Very High (320kbps)"],
+  [256, "High (256kbps)"],
+  [192, "Good (192kbps)"],
+  [128, "Standard (128kbps)"],
+]
+
 /**
  * Describe quality based on codec and bitrate.
  */
@@ -97,17 +135,12 @@ export function getQualityDescription(codec: string, bitrateKbps: number): strin
   if (!bitrateKbps) return "Unknown quality"
   const c = codec.toLowerCase()
 
-  if (["mp3", "aac", "vorbis", "opus"].some((x) => c.includes(x))) {
-    if (bitrateKbps >= 320) return "Very High (320kbps)"
-    if (bitrateKbps >= 256) return "High (256kbps)"
-    if (bitrateKbps >= 192) return "Good (192kbps)"
-    if (bitrateKbps >= 128) return "Standard (128kbps)"
-    return `Low (${bitrateKbps}kbps)`
+  if (LOSSY_CODEC_RE.test(c)) {
+    const tier = LOSSY_TIERS.find(([floor]) => bitrateKbps >= floor)
+    return tier ? tier[1] : `Low (${bitrateKbps}kbps)`
   }
 
-  if (["flac", "wav", "alac", "pcm"].some((x) => c.includes(x))) {
-    return "Lossless (Original Quality)"
-  }
+  if (LOSSLESS_CODEC_RE.test(c)) return "Lossless (Original Quality)"
 
   return `${bitrateKbps}kbps`
 }
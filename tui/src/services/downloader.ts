@@ -5,7 +5,7 @@
  */
 
 import { $ } from "bun"
-import { existsSync, readdirSync } from "fs"
+import { existsSync, readdirSync, readFileSync } from "fs"
 import { join } from "path"
 import type {
   VideoInfo,
@@ -22,17 +22,77 @@ import { getDownloadDirectory, SUBPROCESS_TIMEOUT } from "../utils"
 // Video Info Extraction
 // ============================================================================
 
+// Info lookups are repeated for the same URL (download screen, server job,
+// MCP tools), and each one costs a full yt-dlp extraction. Successful results
+// are kept in a small LRU (Map insertion order) with a TTL. Playlists are not
+// cached, since their entries change as videos are added.
+const VIDEO_INFO_CACHE_TTL = 60 * 60 * 1000 // 1 hour
+const VIDEO_INFO_CACHE_MAX = 256
+const videoInfoCache = new Map<string, { info: VideoInfo; timestamp: number }>()
+
+const YOUTUBE_ID_RE = /(?:youtube\.com\/(?:watch\?(?:.*&)?v=|shorts\/)|youtu\.be\/)([\w-]{11})/
+
+/**
+ * Canonical cache key for a URL: the different spellings of a single
+ * YouTube video (watch, youtu.be, shorts, www/m hosts) share one entry.
+ * Playlist URLs are left as-is since they resolve to more than the video.
+ */
+function videoInfoCacheKey(url: string, cookiesFile?: string, cookiesFromBrowser?: string): string {
+  const match = url.includes("list=") ? null : YOUTUBE_ID_RE.exec(url)
+  const base = match ? `youtube:${match[1]}` : url
+  return `${base}|${cookiesFile || ""}|${cookiesFromBrowser || ""}`
+}
+
+/**
+ * Drop all cached getVideoInfo results.
+ */
+export function clearVideoInfoCache(): void {
+  videoInfoCache.clear()
+}
+
 /**
  * Fetch video/playlist information using yt-dlp (without downloading).
+ *
+ * Single-video results are cached per canonical URL for VIDEO_INFO_CACHE_TTL.
+ * Each caller gets its own copy, so mutating it does not touch the cache.
  */
 export async function getVideoInfo(
   url: string,
   cookiesFile?: string,
   cookiesFromBrowser?: string,
+): Promise<VideoInfo | null> {
+  const key = videoInfoCacheKey(url, cookiesFile, cookiesFromBrowser)
+  const cached = videoInfoCache.get(key)
+  if (cached) {
+    videoInfoCache.delete(key)
+    if (Date.now() - cached.timestamp < VIDEO_INFO_CACHE_TTL) {
+      videoInfoCache.set(key, cached)
+      return structuredClone(cached.info)
+    }
+  }
+
+  const info = await fetchVideoInfo(url, cookiesFile, cookiesFromBrowser)
+  if (info && info._type !== "playlist") {
+    videoInfoCache.set(key, { info: structuredClone(info), timestamp: Date.now() })
+    if (videoInfoCache.size > VIDEO_INFO_CACHE_MAX) {
+      videoInfoCache.delete(videoInfoCache.keys().next().value!)
+    }
+  }
+  return info
+}
+
+async function fetchVideoInfo(
+  url: string,
+  cookiesFile?: string,
+  cookiesFromBrowser?: string,
 ): Promise<VideoInfo | null> {
   try {
     const args = ["yt-dlp", "--dump-json", "--no-download", "--no-warnings", "--quiet"]
 
+    // List playlist entries without resolving each video (one request instead
+    // of one per entry). Full info is fetched on demand via resolvePlaylistEntry.
+    if (isPlaylistUrl(url)) args.push("--flat-playlist")
+
     if (cookiesFile) args.push("--cookies", cookiesFile)
     if (cookiesFromBrowser) args.push("--cookies-from-browser", cookiesFromBrowser)
 
@@ -84,54 +144,87 @@ export async function getVideoInfo(
 }
 
 /**
- * List available formats for a video URL.
+ * Whether a URL points at a playlist rather than a single video.
  */
-export async function listFormats(
+function isPlaylistUrl(url: string): boolean {
+  return url.includes("list=") || url.includes("/playlist") || url.includes("/sets/")
+}
+
+/**
+ * Resolve a flat playlist entry (id/title/url only) to full video info.
+ * Entries that already carry formats are returned unchanged; if the lookup
+ * fails the flat entry is returned so callers can still use its title.
+ * Pass the playlist's cookie options so private or age-gated entries resolve.
+ */
+export async function resolvePlaylistEntry(
+  entry: VideoInfo,
   url: string,
   cookiesFile?: string,
   cookiesFromBrowser?: string,
-): Promise<{ combined: VideoFormat[]; videoOnly: VideoFormat[]; audioOnly: VideoFormat[] } | null> {
-  const info = await getVideoInfo(url, cookiesFile, cookiesFromBrowser)
-  if (!info || !info.formats) return null
+): Promise<VideoInfo> {
+  if (entry.formats) return entry
+  return (await getVideoInfo(url, cookiesFile, cookiesFromBrowser)) || entry
+}
 
+// Sort by quality descending
+function compareByQuality(a: VideoFormat, b: VideoFormat): number {
+  const hDiff = (b.height || 0) - (a.height || 0)
+  if (hDiff !== 0) return hDiff
+  return (b.tbr || 0) - (a.tbr || 0)
+}
+
+function compareByBitrate(a: VideoFormat, b: VideoFormat): number {
+  return (b.tbr || 0) - (a.tbr || 0)
+}
+
+/**
+ * Split formats into combined, video-only and audio-only groups in a single
+ * pass, each sorted by quality. Formats with neither stream are dropped.
+ */
+export function groupFormats(
+  formats: VideoFormat[],
+): { combined: VideoFormat[]; videoOnly: VideoFormat[]; audioOnly: VideoFormat[] } {
   const combined: VideoFormat[] = []
   const videoOnly: VideoFormat[] = []
   const audioOnly: VideoFormat[] = []
 
-  for (const f of info.formats) {
-    if (f.vcodec && f.vcodec !== "none" && f.acodec && f.acodec !== "none") {
-      combined.push(f)
-    } else if (f.vcodec && f.vcodec !== "none") {
-      videoOnly.push(f)
-    } else if (f.acodec && f.acodec !== "none") {
-      audioOnly.push(f)
-    }
-  }
-
-  // Sort by quality descending
-  const sortByQuality = (a: VideoFormat, b: VideoFormat) => {
-    const hDiff = (b.height || 0) - (a.height || 0)
-    if (hDiff !== 0) return hDiff
-    return (b.tbr || 0) - (a.tbr || 0)
+  for (const f of formats) {
+    const hasVideo = !!f.vcodec && f.vcodec !== "none"
+    const hasAudio = !!f.acodec && f.acodec !== "none"
+    if (hasVideo && hasAudio) combined.push(f)
+    else if (hasVideo) videoOnly.push(f)
+    else if (hasAudio) audioOnly.push(f)
   }
 
-  combined.sort(sortByQuality)
-  videoOnly.sort(sortByQuality)
-  audioOnly.sort((a, b) => (b.tbr || 0) - (a.tbr || 0))
+  combined.sort(compareByQuality)
+  videoOnly.sort(compareByQuality)
+  audioOnly.sort(compareByBitrate)
 
   return { combined, videoOnly, audioOnly }
 }
 
+/**
+ * List available formats for a video URL.
+ */
+export async function listFormats(
+  url: string,
+  cookiesFile?: string,
+  cookiesFromBrowser?: string,
+): Promise<{ combined: VideoFormat[]; videoOnly: VideoFormat[]; audioOnly: VideoFormat[] } | null> {
+  const info = await getVideoInfo(url, cookiesFile, cookiesFromBrowser)
+  if (!info || !info.formats) return null
+  return groupFormats(info.formats)
+}
+
 // ============================================================================
 // Download
 // ============================================================================
 
 /**
- * Download a video/audio with the specified format selection.
+ * Build the yt-dlp argument list for a download, excluding the URL(s).
  */
-export async function downloadVideo(options: DownloadOptions): Promise<DownloadResult> {
-  const { url, format, outputDir, cookiesFile, cookiesFromBrowser, isPlaylist, archiveFile, downloadSubs, subLangs } = options
-  const safeDir = getDownloadDirectory(outputDir)
+function buildDownloadArgs(options: Omit<DownloadOptions, "url">, safeDir: string): string[] {
+  const { format, cookiesFile, cookiesFromBrowser, isPlaylist, archiveFile, downloadSubs, subLangs } = options
 
   const outputTemplate = isPlaylist
     ? join(safeDir, "%(playlist_index)03d - %(title)s.%(ext)s")
@@ -189,6 +282,17 @@ export async function downloadVideo(options: DownloadOptions): Promise<DownloadR
       break
   }
 
+  return args
+}
+
+/**
+ * Download a video/audio with the specified format selection.
+ */
+export async function downloadVideo(options: DownloadOptions): Promise<DownloadResult> {
+  const { url, outputDir } = options
+  const safeDir = getDownloadDirectory(outputDir)
+
+  const args = buildDownloadArgs(options, safeDir)
   args.push(url)
 
   try {
@@ -212,6 +316,77 @@ export async function downloadVideo(options: DownloadOptions): Promise<DownloadR
   }
 }
 
+/**
+ * Download several URLs with a single yt-dlp process.
+ *
+ * yt-dlp loads its extractors and opens its HTTP connections once per
+ * process, so handing it every URL at once avoids paying that startup
+ * cost per URL. yt-dlp prints the archive key ("<extractor> <id>") and
+ * original URL of each finished download, which lets us report per-URL
+ * success even when some of them fail. URLs are matched on the key where
+ * it can be derived, so youtu.be and other URL spellings still match.
+ */
+export async function downloadBatch(
+  urls: string[],
+  options: Omit<DownloadOptions, "url">,
+): Promise<DownloadResult[]> {
+  if (urls.length === 0) return []
+  const safeDir = getDownloadDirectory(options.outputDir)
+  const archiveFile = options.archiveFile || (options.isPlaylist ? join(safeDir, ".yt-dlp-archive.txt") : undefined)
+
+  const args = buildDownloadArgs(options, safeDir)
+  if (!options.isPlaylist) args.push("--ignore-errors")
+  args.push("--print", "after_move:%(extractor_key)s %(id)s %(original_url)s", ...urls)
+
+  try {
+    const proc = Bun.spawn(args, {
+      stdout: "pipe",
+      stderr: "pipe",
+    })
+
+    const [stdout, stderr, exitCode] = await Promise.all([
+      new Response(proc.stdout).text(),
+      new Response(proc.stderr).text(),
+      proc.exited,
+    ])
+
+    const ok = (url: string, message = "Download completed successfully"): DownloadResult =>
+      ({ url, success: true, message, outputDir: safeDir })
+    if (exitCode === 0) return urls.map((url) => ok(url))
+
+    const doneKeys = new Set<string>()
+    const doneUrls = new Set<string>()
+    for (const line of stdout.split("\n")) {
+      const [extractor, id, ...rest] = line.trim().split(" ")
+      if (!id) continue
+      doneKeys.add(`${extractor.toLowerCase()} ${id}`)
+      if (rest.length > 0) doneUrls.add(rest.join(" "))
+    }
+    // URLs yt-dlp skipped because they were already archived print nothing
+    const archived = archiveFile ? loadDownloadArchive(archiveFile) : new Set<string>()
+
+    const errorLines = stderr.split("\n").filter((line) => line.startsWith("ERROR:"))
+    const failedCount = urls.filter((url) => {
+      const key = archiveEntryForUrl(url)
+      return !doneUrls.has(url) && !(key && (doneKeys.has(key) || archived.has(key)))
+    }).length
+
+    return urls.map((url) => {
+      const key = archiveEntryForUrl(url)
+      if (doneUrls.has(url) || (key && doneKeys.has(key))) return ok(url)
+      if (key && archived.has(key)) return ok(url, "Already in download archive")
+
+      // Only this URL's own errors; the whole log when it is the sole failure
+      const id = key?.split(" ")[1]
+      const own = errorLines.filter((line) => line.includes(url) || (id !== undefined && line.includes(id)))
+      const message = own.join("\n") || (failedCount === 1 ? stderr.trim() : "") || "Download failed"
+      return { url, success: false, message }
+    })
+  } catch (err) {
+    return urls.map((url) => ({ url, success: false, message: `Download error: ${err}` }))
+  }
+}
+
 /**
  * Download a video with progress reporting via callback.
  */
@@ -321,8 +496,36 @@ export async function downloadVideoWithProgress(
   }
 }
 
+/**
+ * Read a yt-dlp download archive into a set of "<extractor> <id>" lines.
+ * A missing or unreadable archive yields an empty set.
+ */
+export function loadDownloadArchive(path: string): Set<string> {
+  try {
+    const lines = readFileSync(path, "utf-8").split("\n")
+    return new Set(lines.map((line) => line.trim()).filter(Boolean))
+  } catch {
+    return new Set()
+  }
+}
+
+/**
+ * Archive entry a URL would be recorded under, when it can be derived
+ * without asking yt-dlp (single YouTube videos only).
+ */
+function archiveEntryForUrl(url: string): string | null {
+  const match = url.includes("list=") ? null : YOUTUBE_ID_RE.exec(url)
+  return match ? `youtube ${match[1]}` : null
+}
+
 /**
  * Download multiple URLs in parallel.
+ *
+ * URLs are split into one contiguous chunk per worker and each chunk is
+ * handed to a single yt-dlp process (see downloadBatch), so the number of
+ * processes spawned is bounded by the worker count rather than the URL count.
+ * With an archive file, URLs already recorded in it are skipped up front
+ * instead of being passed to yt-dlp only to be rejected.
  */
 export async function downloadParallel(
   urls: string[],
@@ -333,27 +536,39 @@ export async function downloadParallel(
   cookiesFromBrowser?: string,
   archiveFile?: string,
 ): Promise<DownloadResult[]> {
-  const workers = Math.min(Math.max(1, maxWorkers), MAX_WORKERS_LIMIT)
-  const results: DownloadResult[] = []
-
-  // Process in batches
-  for (let i = 0; i < urls.length; i += workers) {
-    const batch = urls.slice(i, i + workers)
-    const promises = batch.map((url) =>
-      downloadVideo({
-        url,
-        format,
-        outputDir,
-        cookiesFile,
-        cookiesFromBrowser,
-        archiveFile,
-      }),
-    )
-    const batchResults = await Promise.all(promises)
-    results.push(...batchResults)
+  if (urls.length === 0) return []
+
+  const archived = archiveFile ? loadDownloadArchive(archiveFile) : new Set<string>()
+  const isArchived = (url: string) => {
+    const entry = archiveEntryForUrl(url)
+    return entry !== null && archived.has(entry)
+  }
+  const pending = archived.size > 0 ? urls.filter((url) => !isArchived(url)) : urls
+
+  const workers = Math.min(Math.max(1, maxWorkers), MAX_WORKERS_LIMIT, pending.length)
+  const chunkSize = Math.ceil(pending.length / workers)
+
+  const chunks: string[][] = []
+  for (let i = 0; i < pending.length; i += chunkSize) {
+    chunks.push(pending.slice(i, i + chunkSize))
   }
 
-  return results
+  const chunkResults = await Promise.all(
+    chunks.map((chunk) =>
+      downloadBatch(chunk, { format, outputDir, cookiesFile, cookiesFromBrowser, archiveFile }),
+    ),
+  )
+
+  const downloaded = chunkResults.flat()
+  if (pending === urls) return downloaded
+
+  // Re-interleave skipped URLs so results stay in input order
+  let next = 0
+  return urls.map((url) =>
+    isArchived(url)
+      ? { url, success: true, message: "Already in download archive" }
+      : downloaded[next++],
+  )
 }
 
 const MAX_WORKERS_LIMIT = 10
@@ -289,21 +289,23 @@ export async function embedMetadataInDir(
   return results
 }
 
+const DEFAULT_OUTPUT_EXTENSIONS = new Set([".mp4", ".mp3", ".m4a", ".mkv", ".webm", ".ogg", ".flac", ".wav", ".avi", ".mov", ".flv", ".3gp"])
+
 /**
  * Find the most recently downloaded file in a directory (for post-download embedding).
  */
 export function findLatestFile(dir: string, extensions?: string[]): string | null {
-  const exts = extensions || [".mp4", ".mp3", ".m4a", ".mkv", ".webm", ".ogg", ".flac", ".wav", ".avi", ".mov", ".flv", ".3gp"]
+  const exts = extensions ? new Set(extensions) : DEFAULT_OUTPUT_EXTENSIONS
 
   try {
     const files = readdirSync(dir) as string[]
     let latestPath: string | null = null
     let latestTime = 0
 
+    // Filter on the listed names first so only candidate media files are stat'ed
     for (const file of files) {
-      const ext = extname(file).toLowerCase()
-      if (!exts.includes(ext)) continue
       if (file.startsWith(".")) continue
+      if (!exts.has(extname(file).toLowerCase())) continue
 
       const fullPath = join(dir, file)
       try {
@@ -3,7 +3,7 @@
  */
 
 import { $ } from "bun"
-import { existsSync, readFileSync, readdirSync, unlinkSync, writeFileSync } from "fs"
+import { readFileSync, readdirSync, unlinkSync, writeFileSync } from "fs"
 import { join, extname, basename } from "path"
 import type {
   TranscriptionResult,
@@ -184,19 +184,12 @@ export async function downloadAudioForTranscription(
       return null
     }
 
-    // Find the downloaded file
-    const wavPath = join(safeDir, "transcription_audio.wav")
-    if (existsSync(wavPath)) return wavPath
-
-    // Search for any transcription_audio file
+    // Find the downloaded file from one directory listing, preferring the
+    // converted WAV over any other transcription_audio leftover
     const files = readdirSync(safeDir)
-    for (const fname of files) {
-      if (fname.startsWith("transcription_audio")) {
-        return join(safeDir, fname)
-      }
-    }
-
-    return null
+    if (files.includes("transcription_audio.wav")) return join(safeDir, "transcription_audio.wav")
+    const fname = files.find((f) => f.startsWith("transcription_audio"))
+    return fname ? join(safeDir, fname) : null
   } catch (err) {
     onProgress?.(`Audio download error: ${err}`)
     return null
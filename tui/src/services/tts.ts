@@ -89,13 +89,15 @@ export async function extractTextFromDocument(
   filePath: string,
   onProgress?: (message: string) => void,
 ): Promise<string | null> {
-  if (!existsSync(filePath)) {
+  let fileSize: number
+  try {
+    fileSize = statSync(filePath).size
+  } catch {
     onProgress?.(`File not found: ${filePath}`)
     return null
   }
 
   const ext = extname(filePath).toLowerCase()
-  const fileSize = statSync(filePath).size
 
   onProgress?.(`Reading ${basename(filePath)} (${formatSize(fileSize)})...`)
 
@@ -567,7 +569,10 @@ export async function textToSpeech(
     }
   }
 
-  if (!existsSync(finalOutput)) {
+  let outputSize: number
+  try {
+    outputSize = statSync(finalOutput).size
+  } catch {
     return {
       success: false,
       engine,
@@ -577,8 +582,6 @@ export async function textToSpeech(
       message: "Output file was not created.",
     }
   }
-
-  const outputSize = statSync(finalOutput).size
   onProgress?.(`Speech generated: ${finalOutput} (${formatSize(outputSize)})`)
 
   return {
@@ -3,7 +3,7 @@
  */
 
 import { $ } from "bun"
-import { existsSync, mkdirSync, accessSync, constants, statSync, readdirSync, unlinkSync, realpathSync } from "fs"
+import { existsSync, mkdirSync, accessSync, constants, statSync, readdirSync, unlinkSync, realpathSync, readFileSync } from "fs"
 import { homedir, tmpdir, platform } from "os"
 import { join, isAbsolute, extname, basename, resolve } from "path"
 import type { SupportedSites, AudioFormats, WhisperModels, TTSEngine } from "./types"
@@ -33,79 +33,85 @@ export const TTS_CHUNK_MAX_CHARS = 5000
 // Site Detection
 // ============================================================================
 
+// Lookup tables are built once and frozen so callers share one read-only copy.
+function freezeTable<T extends Record<string, object>>(table: T): T {
+  for (const entry of Object.values(table)) Object.freeze(entry)
+  return Object.freeze(table)
+}
+
+const SUPPORTED_SITES: SupportedSites = freezeTable({
+  youtube: {
+    name: "YouTube",
+    description: "YouTube videos, playlists, and channels",
+    example: "https://youtube.com/watch?v=VIDEO_ID",
+  },
+  vimeo: {
+    name: "Vimeo",
+    description: "Vimeo videos",
+    example: "https://vimeo.com/VIDEO_ID",
+  },
+  soundcloud: {
+    name: "SoundCloud",
+    description: "SoundCloud tracks and playlists",
+    example: "https://soundcloud.com/artist/track",
+  },
+  dailymotion: {
+    name: "Dailymotion",
+    description: "Dailymotion videos",
+    example: "https://dailymotion.com/video/VIDEO_ID",
+  },
+  twitch: {
+    name: "Twitch",
+    description: "Twitch videos and clips",
+    example: "https://twitch.tv/videos/VIDEO_ID",
+  },
+  bandcamp: {
+    name: "Bandcamp",
+    description: "Bandcamp tracks and albums",
+    example: "https://artist.bandcamp.com/track/track-name",
+  },
+  tiktok: {
+    name: "TikTok",
+    description: "TikTok videos",
+    example: "https://tiktok.com/@user/video/VIDEO_ID",
+  },
+  instagram: {
+    name: "Instagram",
+    description: "Instagram reels and videos",
+    example: "https://instagram.com/reel/REEL_ID",
+  },
+  other: {
+    name: "Other/Direct URL",
+    description: "Any URL supported by yt-dlp (1800+ sites)",
+    example: "https://example.com/video",
+  },
+})
+
 export function getSupportedSites(): SupportedSites {
-  return {
-    youtube: {
-      name: "YouTube",
-      description: "YouTube videos, playlists, and channels",
-      example: "https://youtube.com/watch?v=VIDEO_ID",
-    },
-    vimeo: {
-      name: "Vimeo",
-      description: "Vimeo videos",
-      example: "https://vimeo.com/VIDEO_ID",
-    },
-    soundcloud: {
-      name: "SoundCloud",
-      description: "SoundCloud tracks and playlists",
-      example: "https://soundcloud.com/artist/track",
-    },
-    dailymotion: {
-      name: "Dailymotion",
-      description: "Dailymotion videos",
-      example: "https://dailymotion.com/video/VIDEO_ID",
-    },
-    twitch: {
-      name: "Twitch",
-      description: "Twitch videos and clips",
-      example: "https://twitch.tv/videos/VIDEO_ID",
-    },
-    bandcamp: {
-      name: "Bandcamp",
-      description: "Bandcamp tracks and albums",
-      example: "https://artist.bandcamp.com/track/track-name",
-    },
-    tiktok: {
-      name: "TikTok",
-      description: "TikTok videos",
-      example: "https://tiktok.com/@user/video/VIDEO_ID",
-    },
-    instagram: {
-      name: "Instagram",
-      description: "Instagram reels and videos",
-      example: "https://instagram.com/reel/REEL_ID",
-    },
-    other: {
-      name: "Other/Direct URL",
-      description: "Any URL supported by yt-dlp (1800+ sites)",
-      example: "https://example.com/video",
-    },
-  }
+  return SUPPORTED_SITES
 }
 
+// Registrable domain -> site key. Subdomains (m.youtube.com, artist.bandcamp.com)
+// resolve through their last two labels, so detection is a single Map lookup.
+const SITE_HOSTS = new Map<string, string>([
+  ["youtube.com", "youtube"],
+  ["youtu.be", "youtube"],
+  ["vimeo.com", "vimeo"],
+  ["soundcloud.com", "soundcloud"],
+  ["dailymotion.com", "dailymotion"],
+  ["twitch.tv", "twitch"],
+  ["bandcamp.com", "bandcamp"],
+  ["tiktok.com", "tiktok"],
+  ["instagram.com", "instagram"],
+])
+
 export function detectSite(url: string): string {
   try {
-    const parsed = new URL(url.toLowerCase().startsWith("http") ? url.toLowerCase() : `https://${url.toLowerCase()}`)
-    let hostname = parsed.hostname
-    if (hostname.startsWith("www.")) hostname = hostname.slice(4)
-
-    if (hostname === "youtube.com" || hostname.endsWith(".youtube.com") || hostname === "youtu.be")
-      return "youtube"
-    if (hostname === "vimeo.com" || hostname.endsWith(".vimeo.com"))
-      return "vimeo"
-    if (hostname === "soundcloud.com" || hostname.endsWith(".soundcloud.com"))
-      return "soundcloud"
-    if (hostname === "dailymotion.com" || hostname.endsWith(".dailymotion.com"))
-      return "dailymotion"
-    if (hostname === "twitch.tv" || hostname.endsWith(".twitch.tv"))
-      return "twitch"
-    if (hostname.endsWith(".bandcamp.com") || hostname === "bandcamp.com")
-      return "bandcamp"
-    if (hostname === "tiktok.com" || hostname.endsWith(".tiktok.com"))
-      return "tiktok"
-    if (hostname === "instagram.com" || hostname.endsWith(".instagram.com"))
-      return "instagram"
-    return "other"
+    const lower = url.toLowerCase()
+    const hostname = new URL(lower.startsWith("http") ? lower : `https://${lower}`).hostname
+    const lastDot = hostname.lastIndexOf(".")
+    const domainStart = hostname.lastIndexOf(".", lastDot - 1) + 1
+    return SITE_HOSTS.get(hostname.slice(domainStart)) ?? "other"
   } catch {
     return "other"
   }
@@ -123,50 +129,73 @@ export function isValidUrl(url: string): boolean {
   return true
 }
 
-// Precompiled YouTube URL patterns (avoid re-creating RegExp objects on every call)
-const YOUTUBE_URL_PATTERNS = [
-  /^(https?:\/\/)?(www\.)?youtube\.com\/watch\?v=[\w-]{11}/,
-  /^(https?:\/\/)?(www\.)?youtu\.be\/[\w-]{11}/,
-  /^(https?:\/\/)?(www\.)?youtube\.com\/shorts\/[\w-]{11}/,
-  /^(https?:\/\/)?(www\.)?youtube\.com\/(playlist\?list=|watch\?.*&list=)/,
-  /^(https?:\/\/)?(www\.)?youtube\.com\/(channel\/|c\/|user\/|@)/,
-] as const
+// A `#` comment (to end of line) or a whitespace-delimited token. Only tokens
+// are captured, so one regex pass both splits the list and drops comments.
+const URL_LIST_TOKEN_RE = /#[^\n]*|(\S+)/g
+
+/**
+ * Split a pasted list or URL file into URLs. Accepts newline- or
+ * space-separated entries and ignores blank lines and `#` comments.
+ */
+export function parseUrlList(text: string): string[] {
+  const urls: string[] = []
+  for (const match of text.matchAll(URL_LIST_TOKEN_RE)) {
+    if (match[1]) urls.push(match[1])
+  }
+  return urls
+}
+
+/**
+ * Read a URL list file (one URL per line, `#` comments allowed).
+ */
+export function readUrlsFromFile(path: string): string[] {
+  return parseUrlList(readFileSync(path, "utf-8"))
+}
+
+// Single precompiled alternation covering videos, youtu.be links, shorts,
+// playlists and channels, so validation is one regex test rather than five
+const YOUTUBE_URL_RE =
+  /^(?:https?:\/\/)?(?:www\.)?(?:youtu\.be\/[\w-]{11}|youtube\.com\/(?:watch\?v=[\w-]{11}|shorts\/[\w-]{11}|playlist\?list=|watch\?.*&list=|channel\/|c\/|user\/|@))/
 
 export function isValidYoutubeUrl(url: string): boolean {
-  return YOUTUBE_URL_PATTERNS.some((p) => p.test(url))
+  return YOUTUBE_URL_RE.test(url)
 }
 
 // ============================================================================
 // Formatting
 // ============================================================================
 
+function pad2(n: number): string {
+  return n < 10 ? `0${n}` : `${n}`
+}
+
 export function formatDuration(seconds: number | undefined): string {
   if (!seconds) return "Unknown"
-  const hrs = Math.floor(seconds / 3600)
-  const mins = Math.floor((seconds % 3600) / 60)
-  const secs = Math.floor(seconds % 60)
+  const total = Math.floor(seconds)
+  const hrs = Math.floor(total / 3600)
+  const rem = total - hrs * 3600
+  const mins = Math.floor(rem / 60)
+  const secs = rem - mins * 60
 
-  if (hrs > 0) {
-    return `${hrs}:${String(mins).padStart(2, "0")}:${String(secs).padStart(2, "0")}`
-  }
-  return `${String(mins).padStart(2, "0")}:${String(secs).padStart(2, "0")}`
+  return hrs > 0 ? `${hrs}:${pad2(mins)}:${pad2(secs)}` : `${pad2(mins)}:${pad2(secs)}`
 }
 
+const SIZE_UNITS = ["B", "KB", "MB", "GB", "TB"] as const
+const SIZE_DIVISORS = SIZE_UNITS.map((_, i) => 1024 ** i)
+
 export function formatSize(bytes: number | undefined): string {
   if (!bytes || bytes === 0) return "0B"
-  const units = ["B", "KB", "MB", "GB", "TB"]
-  let i = 0
-  let size = bytes
-  while (size >= 1024 && i < units.length - 1) {
-    size /= 1024
-    i++
-  }
-  return `${size.toFixed(2)} ${units[i]}`
+  // Each unit spans 10 powers of two, so log2 picks the unit without a divide loop
+  const i = bytes < 1024 ? 0 : Math.min(Math.floor(Math.log2(bytes) / 10), SIZE_UNITS.length - 1)
+  return `${(bytes / SIZE_DIVISORS[i]).toFixed(2)} ${SIZE_UNITS[i]}`
 }
 
+// toLocaleString() builds a fresh Intl formatter on every call; reuse one instead
+const COUNT_FORMATTER = new Intl.NumberFormat()
+
 export function formatCount(count: number | undefined): string {
   if (!count) return "Unknown"
-  return count.toLocaleString()
+  return COUNT_FORMATTER.format(count)
 }
 
 export function formatTimestampSrt(seconds: number): string {
@@ -189,6 +218,11 @@ export function formatTimestampVtt(seconds: number): string {
 // File System Helpers
 // ============================================================================
 
+// Resolved download directories keyed on the full candidate list, so repeat
+// calls (one per download) skip the mkdir probe but still follow HOME/cwd
+// changes and re-confirm the directory is writable.
+const resolvedDownloadDirs = new Map<string, string>()
+
 export function getDownloadDirectory(specifiedDir: string = "youtube_downloads"): string {
   const candidates: string[] = []
 
@@ -200,10 +234,22 @@ export function getDownloadDirectory(specifiedDir: string = "youtube_downloads")
     candidates.push(join(tmpdir(), specifiedDir))
   }
 
+  const key = candidates.join("\0")
+  const cached = resolvedDownloadDirs.get(key)
+  if (cached) {
+    try {
+      accessSync(cached, constants.W_OK)
+      return cached
+    } catch {
+      resolvedDownloadDirs.delete(key)
+    }
+  }
+
   for (const dir of candidates) {
     try {
       mkdirSync(dir, { recursive: true })
       accessSync(dir, constants.W_OK)
+      resolvedDownloadDirs.set(key, dir)
       return dir
     } catch {
       continue
@@ -223,9 +269,9 @@ const ALL_MEDIA_EXTENSIONS = new Set<string>([
 
 export function isLocalMediaFile(path: string): boolean {
   try {
-    if (!existsSync(path)) return false
-    const ext = extname(path).toLowerCase()
-    return ALL_MEDIA_EXTENSIONS.has(ext)
+    // Extension check first: it is free and rejects most inputs (URLs) without a stat
+    if (!ALL_MEDIA_EXTENSIONS.has(extname(path).toLowerCase())) return false
+    return existsSync(path)
   } catch {
     return false
   }
@@ -336,63 +382,122 @@ export async function withSubprocessTimeout(
 }
 
 // ============================================================================
-// Dependency Checks
+// Concurrency
 // ============================================================================
 
-export async function checkYtDlp(): Promise<boolean> {
-  try {
-    const result = await $`yt-dlp --version`.quiet()
-    return result.exitCode === 0
-  } catch {
-    return false
+/**
+ * Create a semaphore-style limiter: the returned function runs at most `limit`
+ * tasks at once and starts queued tasks in submission order as slots free up.
+ */
+export function createLimiter(limit: number): <T>(task: () => Promise<T>) => Promise<T> {
+  const max = Math.max(1, limit || 1)
+  const waiting: (() => void)[] = []
+  let active = 0
+
+  const release = () => {
+    active--
+    const next = waiting.shift()
+    if (next) next()
   }
-}
 
-export async function checkFfmpeg(): Promise<boolean> {
-  try {
-    const result = await $`ffmpeg -version`.quiet()
-    return result.exitCode === 0
-  } catch {
-    return false
+  return <T>(task: () => Promise<T>): Promise<T> => {
+    return new Promise<T>((resolve, reject) => {
+      const start = () => {
+        active++
+        Promise.resolve().then(task).then(resolve, reject).finally(release)
+      }
+      if (active < max) start()
+      else waiting.push(start)
+    })
   }
 }
 
-export async function checkWhisper(): Promise<boolean> {
-  try {
-    const result = await $`python3 -c "from faster_whisper import WhisperModel; print('ok')"`.quiet()
-    return result.exitCode === 0
-  } catch {
-    return false
+// ============================================================================
+// Dependency Checks
+// ============================================================================
+
+// Tool availability does not change while the app runs, so each probe is
+// spawned once and its promise shared. Call clearDependencyCache() after
+// installing or removing tools.
+const dependencyChecks = new Map<string, Promise<boolean>>()
+
+export function memoizeCheck(key: string, probe: () => Promise<boolean>): Promise<boolean> {
+  let pending = dependencyChecks.get(key)
+  if (!pending) {
+    pending = probe()
+    dependencyChecks.set(key, pending)
   }
+  return pending
+}
+
+export function clearDependencyCache(): void {
+  dependencyChecks.clear()
+}
+
+export function checkYtDlp(): Promise<boolean> {
+  return memoizeCheck("yt-dlp", async () => {
+    try {
+      const result = await $`yt-dlp --version`.quiet()
+      return result.exitCode === 0
+    } catch {
+      return false
+    }
+  })
+}
+
+export function checkFfmpeg(): Promise<boolean> {
+  return memoizeCheck("ffmpeg", async () => {
+    try {
+      const result = await $`ffmpeg -version`.quiet()
+      return result.exitCode === 0
+    } catch {
+      return false
+    }
+  })
+}
+
+export function checkWhisper(): Promise<boolean> {
+  return memoizeCheck("whisper", async () => {
+    try {
+      const result = await $`python3 -c "from faster_whisper import WhisperModel; print('ok')"`.quiet()
+      return result.exitCode === 0
+    } catch {
+      return false
+    }
+  })
 }
 
 // ============================================================================
 // Audio Format Definitions
 // ============================================================================
 
+const AUDIO_FORMATS: AudioFormats = freezeTable({
+  mp3: { name: "MP3", description: "MPEG Audio Layer 3 (Lossy)", defaultBitrate: 192, codec: "libmp3lame" },
+  aac: { name: "AAC", description: "Advanced Audio Coding (Lossy)", defaultBitrate: 192, codec: "aac" },
+  m4a: { name: "M4A", description: "MPEG-4 Audio (AAC in M4A container)", defaultBitrate: 192, codec: "aac" },
+  ogg: { name: "OGG", description: "Ogg Vorbis (Lossy)", defaultBitrate: 192, codec: "libvorbis" },
+  wav: { name: "WAV", description: "Waveform Audio (Lossless)", defaultBitrate: 1411, codec: "pcm_s16le" },
+  flac: { name: "FLAC", description: "Free Lossless Audio Codec", defaultBitrate: 1000, codec: "flac" },
+})
+
 export function getSupportedAudioFormats(): AudioFormats {
-  return {
-    mp3: { name: "MP3", description: "MPEG Audio Layer 3 (Lossy)", defaultBitrate: 192, codec: "libmp3lame" },
-    aac: { name: "AAC", description: "Advanced Audio Coding (Lossy)", defaultBitrate: 192, codec: "aac" },
-    m4a: { name: "M4A", description: "MPEG-4 Audio (AAC in M4A container)", defaultBitrate: 192, codec: "aac" },
-    ogg: { name: "OGG", description: "Ogg Vorbis (Lossy)", defaultBitrate: 192, codec: "libvorbis" },
-    wav: { name: "WAV", description: "Waveform Audio (Lossless)", defaultBitrate: 1411, codec: "pcm_s16le" },
-    flac: { name: "FLAC", description: "Free Lossless Audio Codec", defaultBitrate: 1000, codec: "flac" },
-  }
+  return AUDIO_FORMATS
 }
 
 // ============================================================================
 // Whisper Model Definitions
 // ============================================================================
 
+const WHISPER_MODELS: WhisperModels = freezeTable({
+  tiny: { name: "Tiny", description: "Fastest, lowest accuracy (~1GB VRAM)", sizeMb: 75 },
+  base: { name: "Base", description: "Fast with decent accuracy (~1GB VRAM)", sizeMb: 142 },
+  small: { name: "Small", description: "Good balance of speed and accuracy (~2GB VRAM)", sizeMb: 466 },
+  medium: { name: "Medium", description: "High accuracy, slower (~5GB VRAM)", sizeMb: 1500 },
+  large: { name: "Large", description: "Best accuracy, slowest (~10GB VRAM)", sizeMb: 2900 },
+})
+
 export function getWhisperModels(): WhisperModels {
-  return {
-    tiny: { name: "Tiny", description: "Fastest, lowest accuracy (~1GB VRAM)", sizeMb: 75 },
-    base: { name: "Base", description: "Fast with decent accuracy (~1GB VRAM)", sizeMb: 142 },
-    small: { name: "Small", description: "Good balance of speed and accuracy (~2GB VRAM)", sizeMb: 466 },
-    medium: { name: "Medium", description: "High accuracy, slower (~5GB VRAM)", sizeMb: 1500 },
-    large: { name: "Large", description: "Best accuracy, slowest (~10GB VRAM)", sizeMb: 2900 },
-  }
+  return WHISPER_MODELS
 }
 
 // ============================================================================
@@ -465,9 +570,9 @@ export async function checkPdfToText(): Promise<boolean> {
 
 export function isSupportedDocumentFile(path: string): boolean {
   try {
-    if (!existsSync(path)) return false
     const ext = extname(path).toLowerCase()
-    return (SUPPORTED_DOCUMENT_EXTENSIONS as readonly string[]).includes(ext)
+    if (!(SUPPORTED_DOCUMENT_EXTENSIONS as readonly string[]).includes(ext)) return false
+    return existsSync(path)
   } catch {
     return false
   }